@@ -1,10 +1,15 @@
 import pandas as pd
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import os
 import logging
 import time
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from rate_limiter import TokenBucket
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,6 +22,43 @@ load_dotenv()
 CMC_API_KEY = os.getenv("CMC_API_KEY")
 CMC_URL = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
 OUTPUT_FILE = "cmcdata.json"
+PROGRESS_FILE = "cmcdata.jsonl"  # Append-only log of {symbol: {"ts", "payload"}} quotes, merged into OUTPUT_FILE
+SCORE_SHEET_FILE = "how3.io score sheet - Score Sheet (Master).csv"
+# pyarrow's multithreaded CSV reader is used when it is installed
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
+CMC_BATCH_SIZE = 100  # Max symbols per quotes/latest request
+MAX_WORKERS = 4  # Concurrent batch requests in flight
+CACHE_FILE = ".cmc_cache.json"
+CACHE_TTL = 300  # Seconds a cached quote stays fresh
+
+CMC_RATE_LIMIT = 30  # Requests per minute allowed by the CMC plan (Basic tier)
+REQUEST_TIMEOUT = (3, 10)  # (connect, read) seconds
+HEADERS = {
+    'Accepts': 'application/json',
+    'X-CMC_PRO_API_KEY': CMC_API_KEY
+}
+# skip_invalid keeps one unknown symbol from failing the whole batch with HTTP 400
+BASE_PARAMS = {'convert': 'USD', 'skip_invalid': 'true'}
+
+# Shared HTTP session so TCP/TLS connections are kept alive across requests
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+# Retry rate limits and transient server errors with exponential backoff,
+# honouring CMC's Retry-After header when it sends one
+RETRY = Retry(
+    total=5,
+    backoff_factor=2.0,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=["GET"],
+    respect_retry_after_header=True
+)
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=RETRY))
+
+# Prepared once; each request only swaps in its own query string
+BASE_REQUEST = SESSION.prepare_request(requests.Request('GET', CMC_URL, params=BASE_PARAMS))
+
+# Shared across worker threads so concurrent batches respect CMC_RATE_LIMIT
+CMC_LIMITER = TokenBucket(CMC_RATE_LIMIT, per=60)
 
 # Symbol mapping for known CoinMarketCap discrepancies
 SYMBOL_MAPPING = {
@@ -27,90 +69,163 @@ SYMBOL_MAPPING = {
     "venus usdt": "VUSDT"
 }
 
-def fetch_cmc_data(symbol):
-    if not isinstance(symbol, str):
-        if isinstance(symbol, float):
-            logger.warning(f"Invalid symbol type (float): {symbol}")
-            return None
-        else:
-            logger.warning(f"Invalid symbol type: {symbol}")
-            return None
+def chunked(items, size):
+    """Yield successive lists of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _fmt(value, scale, prefix="", suffix=""):
+    """Scale and format a CMC number to two decimals, or "N/A" when missing/zero."""
+    return f"{prefix}{value / scale:.2f}{suffix}" if value else "N/A"
+
+def format_quote(coin_data, cmc_symbol):
+    """Turn a CMC coin entry into the keyStats structure used downstream."""
+    quote = coin_data['quote']['USD']
+    return {
+        "marketCap": _fmt(quote['market_cap'], 1e9, "$", " billion"),
+        "tradingVolume": _fmt(quote['volume_24h'], 1e6, "$", " million (24h)"),
+        "circulatingSupply": _fmt(coin_data['circulating_supply'], 1e6, suffix=f" million {cmc_symbol}"),
+        "totalSupply": _fmt(coin_data['total_supply'], 1e6, suffix=f" million {cmc_symbol}")
+    }
+
+def load_cache():
+    """Load cached quotes as cmc_symbol -> {"ts": ..., "payload": ...}."""
+    try:
+        with open(CACHE_FILE, "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable CMC cache {CACHE_FILE}: {str(e)}")
+        return {}
+
+def save_cache(cache):
+    """Write the quote cache atomically so an interrupted run can't corrupt it."""
+    tmp_file = CACHE_FILE + ".tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            f.write(orjson.dumps(cache))
+        os.replace(tmp_file, CACHE_FILE)
+    except Exception as e:
+        logger.warning(f"Could not save CMC cache: {str(e)}")
+
+def read_progress(max_age=CACHE_TTL):
+    """Read quotes logged by an interrupted previous run, skipping any older than max_age seconds."""
+    quotes = {}
+    now = time.time()
+    try:
+        with open(PROGRESS_FILE, "rb") as f:
+            for line in f:
+                try:
+                    for cmc_symbol, entry in orjson.loads(line).items():
+                        if now - entry["ts"] < max_age:
+                            quotes[cmc_symbol] = entry["payload"]
+                except (orjson.JSONDecodeError, KeyError, TypeError, AttributeError):
+                    logger.warning(f"Skipping truncated line in {PROGRESS_FILE}")
+    except FileNotFoundError:
+        pass
+    return quotes
+
+def fetch_cmc_batch(cmc_symbols):
+    """Fetch quotes for up to CMC_BATCH_SIZE already-mapped CMC symbols in one request.
     
-    cmc_symbol = SYMBOL_MAPPING.get(symbol.lower(), symbol.upper())
+    Returns a dict of cmc_symbol -> formatted market data. Symbols missing from
+    the response are simply absent from the result.
+    """
+    results = {}
     try:
-        parameters = {
-            'symbol': cmc_symbol,
-            'convert': 'USD'
-        }
-        headers = {
-            'Accepts': 'application/json',
-            'X-CMC_PRO_API_KEY': CMC_API_KEY
-        }
-        response = requests.get(CMC_URL, headers=headers, params=parameters, verify=False)
-        response.raise_for_status()
-        
-        # Handle rate limiting
-        if response.status_code == 429:
-            logger.warning(f"Rate limit hit for {symbol}, waiting 60 seconds")
-            time.sleep(60)
-            response = requests.get(CMC_URL, headers=headers, params=parameters, verify=False)
+        parameters = {**BASE_PARAMS, 'symbol': ",".join(cmc_symbols)}
+        request = BASE_REQUEST.copy()
+        request.prepare_url(CMC_URL, parameters)
+        CMC_LIMITER.acquire()
+        # Stream the body and hand the raw bytes straight to orjson, skipping
+        # requests' chunked content buffering and any bytes -> str decode
+        with SESSION.send(request, timeout=REQUEST_TIMEOUT, stream=True) as response:
             response.raise_for_status()
+            data = orjson.loads(response.raw.read(decode_content=True))
         
-        data = response.json()
-        
-        if cmc_symbol in data['data']:
-            coin_data = data['data'][cmc_symbol]
-            quote = coin_data['quote']['USD']
-            market_cap = "${:.2f} billion".format(quote['market_cap'] / 1e9) if quote['market_cap'] else "N/A"
-            volume_24h = "${:.2f} million (24h)".format(quote['volume_24h'] / 1e6) if quote['volume_24h'] else "N/A"
-            circulating_supply = "{:.2f} million {}".format(coin_data['circulating_supply'] / 1e6, cmc_symbol) if coin_data['circulating_supply'] else "N/A"
-            total_supply = "{:.2f} million {}".format(coin_data['total_supply'] / 1e6, cmc_symbol) if coin_data['total_supply'] else "N/A"
-            
-            return {
-                "marketCap": market_cap,
-                "tradingVolume": volume_24h,
-                "circulatingSupply": circulating_supply,
-                "totalSupply": total_supply
-            }
-        else:
-            logger.warning(f"Symbol not found in CMC response: {cmc_symbol}")
-            return None
-    except Exception as e:
-        logger.error(f"Error fetching CMC data for {symbol}: {str(e)}")
-        return None
+        for cmc_symbol in cmc_symbols:
+            if cmc_symbol in data['data']:
+                results[cmc_symbol] = format_quote(data['data'][cmc_symbol], cmc_symbol)
+            else:
+                logger.warning(f"Symbol not found in CMC response: {cmc_symbol}")
+    except requests.Timeout:
+        logger.warning(f"Timed out fetching CMC data for {len(cmc_symbols)} symbols")
+    except requests.HTTPError as e:
+        logger.error(f"CMC returned HTTP {e.response.status_code} for {','.join(cmc_symbols)}")
+    except requests.RequestException as e:
+        logger.error(f"Request error fetching CMC data for {','.join(cmc_symbols)}: {e}")
+    except (KeyError, ValueError) as e:
+        # Malformed or unexpected payload; retrying would not help
+        logger.error(f"Could not parse CMC response for {','.join(cmc_symbols)}: {e!r}")
+    return results
 
 def main():
     try:
         # Read CSV
-        df = pd.read_csv("how3.io score sheet - Score Sheet (Master).csv")
+        df = pd.read_csv(SCORE_SHEET_FILE, usecols=["Symbol", "Project"], dtype=str, engine=CSV_ENGINE)
         logger.info(f"Loaded CSV with {len(df)} rows")
         
+        # Resolve every row to its CMC symbol once, before any HTTP I/O
+        invalid = df["Symbol"].isna()
+        for name in df.loc[invalid, "Project"]:
+            logger.warning(f"Skipping {name}: missing symbol")
+        valid_df = df[~invalid]
+        symbols = valid_df["Symbol"].astype("string").str.lower()
+        resolved = symbols.map(SYMBOL_MAPPING).fillna(symbols.str.upper())
+        rows = list(zip(symbols.tolist(), valid_df["Project"].tolist(), resolved.tolist()))
+        
+        # Fetch all quotes in batches of CMC_BATCH_SIZE symbols, several batches at a time
+        # Quotes fetched within the last CACHE_TTL seconds are served from disk
+        unique_symbols = list(dict.fromkeys(cmc_symbol for _, _, cmc_symbol in rows))
+        cache = load_cache()
+        now = time.time()
+        quotes = {
+            cmc_symbol: cache[cmc_symbol]["payload"]
+            for cmc_symbol in unique_symbols
+            if cmc_symbol in cache and now - cache[cmc_symbol]["ts"] < CACHE_TTL
+        }
+        # Quotes logged by an interrupted run are reused as well, under the same TTL
+        quotes.update(read_progress())
+        missing = [cmc_symbol for cmc_symbol in unique_symbols if cmc_symbol not in quotes]
+        logger.info(f"{len(quotes)} symbols already available, {len(missing)} to fetch")
+        
+        batches = list(chunked(missing, CMC_BATCH_SIZE))
+        if batches:
+            logger.info(f"Fetching CMC data for {len(missing)} symbols in {len(batches)} batches")
+            # Each fetched quote is appended to PROGRESS_FILE as soon as its batch completes
+            with open(PROGRESS_FILE, "a", buffering=1) as progress, \
+                    ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                futures = [executor.submit(fetch_cmc_batch, batch) for batch in batches]
+                # Handle batches in completion order so a slow one doesn't hold up the rest
+                for future in as_completed(futures):
+                    batch_quotes = future.result()
+                    fetched_at = time.time()
+                    for cmc_symbol, payload in batch_quotes.items():
+                        entry = {"ts": fetched_at, "payload": payload}
+                        cache[cmc_symbol] = entry
+                        quotes[cmc_symbol] = payload
+                        progress.write(orjson.dumps({cmc_symbol: entry}).decode() + "\n")
+            save_cache(cache)
+        
         # Collect CMC data
         cmc_data = {}
         error_count = 0
         
-        for i, row in df.iterrows():
-            try:
-                symbol = row["Symbol"].lower()
-                name = row["Project"]
-                
-                logger.info(f"Fetching CMC data for {name} ({symbol})")
-                data = fetch_cmc_data(symbol)
-                if data:
-                    cmc_data[symbol] = data
-                else:
-                    logger.warning(f"Could not fetch CMC data for {name} ({symbol})")
-                    error_count += 1
-                
-                time.sleep(3)
-            except Exception as e:
-                logger.error(f"Error processing {row['Project']}: {e}")
+        for symbol, name, cmc_symbol in rows:
+            data = quotes.get(cmc_symbol)
+            if data:
+                cmc_data[symbol] = data
+            else:
+                logger.warning(f"Could not fetch CMC data for {name} ({symbol})")
                 error_count += 1
-                continue
+        error_count += len(df) - len(rows)
         
         # Save CMC data to JSON file
-        with open(OUTPUT_FILE, "w") as f:
-            json.dump(cmc_data, f, indent=4)
+        with open(OUTPUT_FILE, "wb") as f:
+            f.write(orjson.dumps(cmc_data, option=orjson.OPT_INDENT_2))
+        if os.path.exists(PROGRESS_FILE):
+            os.remove(PROGRESS_FILE)
         
         logger.info(f"Successfully fetched CMC data for {len(cmc_data)} projects")
         logger.info(f"Failed to fetch CMC data for {error_count} projects")
@@ -1,15 +1,18 @@
-import pandas as pd
-import requests
 import json
+import orjson
 import os
-import time
+import importlib.util
+import random
 import re
 import logging
 import traceback
-import copy
+import asyncio
+from dataclasses import dataclass
 from datetime import datetime
-import google.generativeai as genai
-from dotenv import load_dotenv
+from functools import lru_cache
+from types import MappingProxyType
+from rate_limiter import TokenBucket
+from response_cache import ResponseCache, cache_key
 
 # Set up logging
 logging.basicConfig(
@@ -22,23 +25,54 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
-load_dotenv()
-
 # Configuration
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 CMC_DATA_FILE = "cmcdata.json"
+SCORE_SHEET_FILE = "how3.io score sheet - Score Sheet (Master).csv"
+SCORE_SHEET_COLUMNS = ["Project", "Symbol", "Market Sector", "UGS", "EQS", "FVS", "SS"]
+CSV_ENGINE = "pyarrow" if importlib.util.find_spec("pyarrow") else "c"
 GEMINI_MODEL = "gemini-2.0-flash"
 OUTPUT_DIR = "project_content"
+ALL_PROJECTS_FILE = os.path.join(OUTPUT_DIR, "all_projects.json")
+ALL_PROJECTS_LOG = os.path.join(OUTPUT_DIR, "all_projects.ndjson")  # Appended per project, merged at the end
 PLACEHOLDER_PROJECT_ID = "placeholder-project-id"
 PLACEHOLDER_COIN_ID = "placeholder-coin-id"
+CONCURRENCY = 8  # Gemini requests in flight at once
+GEMINI_RATE_LIMIT = 15  # Requests per minute (gemini-2.0-flash free tier)
+GEMINI_MAX_RETRIES = 5  # Retries on quota/availability errors before giving up
+RETRY_BASE_DELAY = 1.0  # Seconds; doubles on each retry
+RETRY_MAX_DELAY = 30.0
+GENERATION_CONFIG = {
+    "temperature": 0.2,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 4000
+}
 
 # Create output directory if it doesn't exist
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel(GEMINI_MODEL)
+gemini_limiter = TokenBucket(GEMINI_RATE_LIMIT, per=60)
+
+# Set by init_gemini(); the Gemini SDK is imported lazily so --example starts fast
+model = None
+response_cache = None
+RETRYABLE_ERRORS = ()
+
+def init_gemini():
+    """Load .env, import the Gemini SDK and create the shared model and response cache."""
+    global model, response_cache, RETRYABLE_ERRORS
+    from dotenv import load_dotenv
+    import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
+    
+    load_dotenv()
+    
+    # Configure Gemini over gRPC; the SDK keeps one pooled channel per client, so the
+    # single module-level model is shared by every concurrent request
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport="grpc")
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    response_cache = ResponseCache(os.path.join(OUTPUT_DIR, ".cache"))
+    RETRYABLE_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable)
 
 # Prompt for Gemini - Using plain text format to avoid JSON parsing issues
 GEMINI_PROMPT = """
@@ -84,60 +118,61 @@ For each section below, provide concise and informative content:
 FORMAT YOUR RESPONSE WITH CLEAR SECTION HEADERS.
 """
 
-# Default structure for fallback
+# Default structure for fallback; headings are callables taking the upper-cased symbol
 DEFAULT_CONTENT = {
     "valueGeneration": {
         "description": "This project generates value by providing a valuable service in the cryptocurrency ecosystem. Users benefit from its utility while token holders receive a portion of the fees generated.",
         "title": "Value Generation", 
-        "heading": "How {symbol} Generates Value", 
+        "heading": lambda s: f"How {s} Generates Value", 
         "readTime": 3, 
         "dificultyTag": "Beginner friendly"
     },
     "marketPosition": {
         "description": "The project is known for innovation in its sector. It addresses key challenges and offers unique solutions that differentiate it from competitors in the blockchain space.",
         "title": "Market Position", 
-        "heading": "What is {symbol} Best Known For", 
+        "heading": lambda s: f"What is {s} Best Known For", 
         "readTime": 3, 
         "dificultyTag": "Beginner friendly"
     },
     "projectSize": {
         "description": "This project has established itself as a notable player in the cryptocurrency ecosystem. It has gained recognition for its technology and utility.",
         "title": "Project Size", 
-        "heading": "How Significant is {symbol} in the Crypto Space", 
+        "heading": lambda s: f"How Significant is {s} in the Crypto Space", 
         "readTime": 3, 
         "dificultyTag": "Beginner friendly"
     },
     "RealWorldImpact": {
         "description": "The project has applications across various geographic regions and industries. It provides solutions to real-world problems and has influenced the broader blockchain ecosystem.",
         "title": "Real World Impact", 
-        "heading": "Where Does {symbol} Have Influence", 
+        "heading": lambda s: f"Where Does {s} Have Influence", 
         "readTime": 3, 
         "dificultyTag": "Beginner friendly"
     },
     "founders": {
         "description": "The project was created by a team of blockchain experts with backgrounds in technology and finance. They launched the project with a vision to address key challenges in the sector.",
         "title": "Founders", 
-        "heading": "Who Created {symbol}", 
+        "heading": lambda s: f"Who Created {s}", 
         "readTime": 3, 
         "dificultyTag": "Beginner friendly"
     },
     "problemSolving": {
         "description": "This project solves fundamental challenges in the blockchain space by providing innovative solutions. Its approach addresses inefficiencies and creates new opportunities for users.",
         "title": "Problem Solving", 
-        "heading": "What challenges does {symbol} solve?", 
+        "heading": lambda s: f"What challenges does {s} solve?", 
         "readTime": 3, 
         "dificultyTag": "Beginner friendly"
     },
-    "strengths": [
-        {"title": "Technical Innovation", "description": "The project utilizes cutting-edge technology to deliver its services. This technical foundation provides a competitive advantage in the market."},
-        {"title": "Strong Community", "description": "The project has built a dedicated user base that supports its development. This community engagement helps drive adoption and improvement."},
-        {"title": "Practical Utility", "description": "The project offers real-world applications that solve tangible problems. This utility creates sustainable demand for its services."}
-    ],
-    "weaknesses": [
-        {"title": "Market Competition", "description": "The project faces competition from established players in the space. This competitive landscape could impact its growth potential."},
-        {"title": "Technical Complexity", "description": "Some aspects of the project may be difficult for beginners to understand. This complexity could limit mainstream adoption."},
-        {"title": "Regulatory Considerations", "description": "The project operates in an evolving regulatory environment. Changes in regulations could affect its operations in certain regions."}
-    ],
+    # (title, description) pairs, expanded into dicts by _fresh_default
+    "strengths": (
+        ("Technical Innovation", "The project utilizes cutting-edge technology to deliver its services. This technical foundation provides a competitive advantage in the market."),
+        ("Strong Community", "The project has built a dedicated user base that supports its development. This community engagement helps drive adoption and improvement."),
+        ("Practical Utility", "The project offers real-world applications that solve tangible problems. This utility creates sustainable demand for its services.")
+    ),
+    "weaknesses": (
+        ("Market Competition", "The project faces competition from established players in the space. This competitive landscape could impact its growth potential."),
+        ("Technical Complexity", "Some aspects of the project may be difficult for beginners to understand. This complexity could limit mainstream adoption."),
+        ("Regulatory Considerations", "The project operates in an evolving regulatory environment. Changes in regulations could affect its operations in certain regions.")
+    ),
     "whitepaper": {
         "summary": "The project provides a blockchain-based solution that addresses key challenges in its sector. It utilizes innovative technology to create value for users and token holders while maintaining security and efficiency.",
         "lastUpdated": datetime.now().strftime("%Y-%m-%d"),
@@ -146,35 +181,130 @@ DEFAULT_CONTENT = {
     }
 }
 
+@dataclass(slots=True)
+class ProjectContext:
+    """Per-project strings derived once from a score sheet row."""
+    name: str
+    symbol: str
+    symbol_upper: str
+    sector: str
+    description: str
+    logo: str
+
+    @classmethod
+    def from_row(cls, name, symbol, sector):
+        return cls(
+            name=name,
+            symbol=symbol,
+            symbol_upper=symbol.upper(),
+            sector=sector,
+            description=f"{name} is a decentralized protocol in the {sector} sector.",
+            logo=f"https://cryptologos.cc/logos/{name.lower().replace(' ', '-')}-{symbol}-logo.svg"
+        )
+
+def _fresh_default(symbol):
+    """Build a fresh copy of DEFAULT_CONTENT with headings filled in for symbol."""
+    symbol_upper = symbol.upper()
+    result = {}
+    for key, value in DEFAULT_CONTENT.items():
+        if isinstance(value, tuple):
+            result[key] = [{"title": title, "description": desc} for title, desc in value]
+        else:
+            result[key] = {**value}
+            if "heading" in value:
+                result[key]["heading"] = value["heading"](symbol_upper)
+    return result
+
 def load_cmc_data():
-    """Load market data from CMC data file."""
+    """Load market data from CMC data file as a read-only, lowercase-symbol-keyed mapping."""
     try:
-        with open(CMC_DATA_FILE, 'r') as f:
-            return json.load(f)
+        with open(CMC_DATA_FILE, 'rb') as f:
+            data = orjson.loads(f.read())
+        # Accept either {symbol: quote} or a list of entries carrying their own symbol
+        if isinstance(data, list):
+            data = {entry["symbol"].lower(): entry for entry in data}
+        else:
+            data = {symbol.lower(): quote for symbol, quote in data.items()}
+        return MappingProxyType(data)
     except Exception as e:
         logger.error(f"Error loading CMC data: {str(e)}")
-        return {}
+        return MappingProxyType({})
 
-def extract_section(text, section_name, next_section=None):
-    """Extract content between section_name and next_section (or end of text)."""
-    # Create regex pattern for section headers
-    pattern = rf"(?:{section_name}|{section_name.upper()}).*?:(.*?)"
-    
-    # If next_section is provided, look for that, otherwise match until the end
-    if next_section:
-        pattern += rf"(?:{next_section}|{next_section.upper()})"
-    else:
-        pattern += r"$"
-    
-    # Search for the pattern
-    match = re.search(pattern, text, re.DOTALL | re.IGNORECASE)
-    
-    if match:
-        return match.group(1).strip()
-    return None
+def write_text(path, text):
+    """Write a text file (used for the raw model output)."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
 
-def extract_strengths_weaknesses(text, section_name):
-    """Extract strengths or weaknesses as a list of dictionaries."""
+def save_json(path, data):
+    """Write data as indented JSON using orjson."""
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+# Section headers in the order the prompt asks for them, mapped to result keys
+SECTION_KEYS = {
+    "value generation": ("valueGeneration", "description"),
+    "market position": ("marketPosition", "description"),
+    "project size": ("projectSize", "description"),
+    "real world impact": ("RealWorldImpact", "description"),
+    "founders": ("founders", "description"),
+    "problem solving": ("problemSolving", "description"),
+    "whitepaper summary": ("whitepaper", "summary"),
+}
+
+# Matches a header line such as "**1. Value Generation (50-70 words):**" or
+# "## Strengths". Body text starts after the header's colon (or line end).
+SECTION_RE = re.compile(
+    r"^[ \t#*\d.]*(Value Generation|Market Position|Project Size|Real World Impact|Founders"
+    r"|Problem Solving|Strengths|Weaknesses|Whitepaper Summary)\b[^\n:]*(?::\**|$)",
+    re.MULTILINE | re.IGNORECASE
+)
+
+def append_project(projects_log, symbol, project_json):
+    """Append one finished project to the NDJSON log."""
+    projects_log.write(orjson.dumps({symbol: project_json}) + b"\n")
+    projects_log.flush()
+
+def merge_projects_log(path=ALL_PROJECTS_LOG):
+    """Collapse the NDJSON log into a single dict; later entries win."""
+    projects = {}
+    if not os.path.exists(path):
+        return projects
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                projects.update(orjson.loads(line))
+            except orjson.JSONDecodeError:
+                logger.warning(f"Skipping truncated line in {path}")
+    return projects
+
+def split_sections(text):
+    """Split the response into {lowercased section name: content} in a single pass."""
+    # Splitting on the capturing header pattern yields [preamble, name, body, name, body, ...]
+    parts = SECTION_RE.split(text)
+    sections = {}
+    for name, body in zip(parts[1::2], parts[2::2]):
+        # Keep the first occurrence if the model repeats a header
+        sections.setdefault(name.lower(), body.strip())
+    return sections
+
+# Item formats tried in order by extract_strengths_weaknesses. Titles and
+# descriptions are length-bounded so malformed output can't trigger runaway
+# backtracking.
+ITEM_PATTERNS = [
+    # Format: **Title**: Description
+    re.compile(r'\*\*([^*\n]{1,120}?)\*\*:?\s*(.{1,1500}?)(?=\n\s*\*\*|\Z)', re.DOTALL),
+    # Format: 1. **Title**: Description or 1. Title: Description
+    re.compile(r'\d+\.\s*(?:\*\*)?([^:*\n]{0,120}?)(?:\*\*)?:?\s*(.{1,1500}?)(?=\n\s*\d+\.|\Z)', re.DOTALL),
+    # Format: - **Title**: Description or - Title: Description
+    re.compile(r'-\s*(?:\*\*)?([^:*\n]{0,120}?)(?:\*\*)?:?\s*(.{1,1500}?)(?=\n\s*-\s*|\Z)', re.DOTALL)
+]
+
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+def extract_strengths_weaknesses(section_content, section_name):
+    """Extract strengths or weaknesses from their section text as a list of dictionaries."""
     result = []
     default_items = []
     
@@ -192,32 +322,20 @@ def extract_strengths_weaknesses(text, section_name):
             {"title": "Regulatory Uncertainty", "description": "Like many blockchain projects, it operates in an evolving regulatory landscape. Future regulatory changes could impact operations."}
         ]
     
-    # Extract the section first
-    section_content = extract_section(text, section_name)
     if not section_content:
         logger.warning(f"Could not find {section_name} section, using defaults")
         return default_items
     
-    # Try multiple patterns to extract items
-    patterns = [
-        # Format: **Title**: Description
-        r'(?:\*\*([^:]*?)\*\*:?\s*(.*?)(?=\n\s*\*\*|$))',
-        # Format: 1. **Title**: Description or 1. Title: Description
-        r'(?:\d+\.\s*(?:\*\*)?([^:]*?)(?:\*\*)?:?\s*(.*?)(?=\n\s*\d+\.|$))',
-        # Format: - **Title**: Description or - Title: Description
-        r'(?:-\s*(?:\*\*)?([^:]*?)(?:\*\*)?:?\s*(.*?)(?=\n\s*-\s*|$))'
-    ]
-    
     # Try each pattern until we find matches
     items = []
-    for pattern in patterns:
-        items = re.findall(pattern, section_content, re.DOTALL)
+    for pattern in ITEM_PATTERNS:
+        items = pattern.findall(section_content)
         if items:
             break
     
     # Process matched items
     for title, desc in items:
-        title = re.sub(r'\*\*', '', title).strip()
+        title = title.replace('**', '').strip().rstrip(':').strip()
         desc = desc.strip()
         
         if title and desc:  # Only add if both are non-empty
@@ -228,15 +346,12 @@ def extract_strengths_weaknesses(text, section_name):
     
     # If we didn't get enough items, try paragraph-based extraction
     if len(result) < 3:
-        paragraphs = re.split(r'\n\s*\n', section_content)
-        for para in paragraphs:
+        seen_titles = {item["title"] for item in result}
+        seen_descriptions = {item["description"] for item in result}
+        for para in section_content.split("\n\n"):
             if len(result) >= 3:
                 break
-                
-            # Skip if this paragraph is already captured
-            if any(item["description"] in para for item in result):
-                continue
-                
+            
             # Try to split into title and description
             parts = para.split(':', 1)
             if len(parts) == 2:
@@ -244,7 +359,7 @@ def extract_strengths_weaknesses(text, section_name):
                 desc = parts[1].strip()
             else:
                 # If no colon, use first sentence as title, rest as description
-                sentences = re.split(r'(?<=[.!?])\s+', para)
+                sentences = SENTENCE_SPLIT_RE.split(para)
                 if len(sentences) > 1:
                     title = sentences[0].strip()
                     desc = ' '.join(sentences[1:]).strip()
@@ -257,10 +372,12 @@ def extract_strengths_weaknesses(text, section_name):
                     else:
                         continue  # Skip if too short
             
-            title = re.sub(r'\*\*', '', title).strip()
-            desc = desc.strip()
+            title = title.replace('**', '').strip()
             
-            if title and desc and not any(item["title"] == title for item in result):
+            # Skip paragraphs already captured by the item patterns
+            if title and desc and title not in seen_titles and desc not in seen_descriptions:
+                seen_titles.add(title)
+                seen_descriptions.add(desc)
                 result.append({
                     "title": title,
                     "description": desc
@@ -274,78 +391,60 @@ def extract_strengths_weaknesses(text, section_name):
 
 def parse_text_to_sections(text, symbol):
     """Parse the raw text content into structured sections."""
-    # Define section names and their corresponding next sections
-    sections = [
-        ("Value Generation", "Market Position"),
-        ("Market Position", "Project Size"),
-        ("Project Size", "Real World Impact"),
-        ("Real World Impact", "Founders"),
-        ("Founders", "Problem Solving"),
-        ("Problem Solving", "Strengths"),
-        ("Strengths", "Weaknesses"),
-        ("Weaknesses", "Whitepaper Summary"),
-        ("Whitepaper Summary", None)  # Last section
-    ]
+    # Initialize result structure with headings already formatted
+    result = _fresh_default(symbol)
     
-    # Initialize result structure
-    result = copy.deepcopy(DEFAULT_CONTENT)
-    
-    # Format all headings with the correct symbol
-    for key in result:
-        if isinstance(result[key], dict) and 'heading' in result[key]:
-            result[key]['heading'] = result[key]['heading'].format(symbol=symbol.upper())
-    
-    # Extract text content for each section
-    for section_name, next_section in sections:
-        content = extract_section(text, section_name, next_section)
-        
+    # Split the text into sections once, then map them onto the result structure
+    sections = split_sections(text)
+    for section_name, (key, field) in SECTION_KEYS.items():
+        content = sections.get(section_name)
         if content:
-            # Map section names to keys in result structure
-            if section_name == "Value Generation":
-                result["valueGeneration"]["description"] = content
-            elif section_name == "Market Position":
-                result["marketPosition"]["description"] = content
-            elif section_name == "Project Size":
-                result["projectSize"]["description"] = content
-            elif section_name == "Real World Impact":
-                result["RealWorldImpact"]["description"] = content
-            elif section_name == "Founders":
-                result["founders"]["description"] = content
-            elif section_name == "Problem Solving":
-                result["problemSolving"]["description"] = content
-            elif section_name == "Whitepaper Summary":
-                result["whitepaper"]["summary"] = content
+            result[key][field] = content
     
     # Extract strengths and weaknesses
-    result["strengths"] = extract_strengths_weaknesses(text, "Strengths")
-    result["weaknesses"] = extract_strengths_weaknesses(text, "Weaknesses")
+    result["strengths"] = extract_strengths_weaknesses(sections.get("strengths"), "Strengths")
+    result["weaknesses"] = extract_strengths_weaknesses(sections.get("weaknesses"), "Weaknesses")
     
     return result
 
-def generate_gemini_content(name, symbol, sector, description):
+@lru_cache(maxsize=4096)
+def _format_prompt(name, symbol, sector, description):
+    return GEMINI_PROMPT.format(name=name, symbol=symbol, sector=sector, description=description)
+
+async def generate_gemini_content(project):
     """Generate content using Gemini API."""
+    name = project.name
     try:
         # Format the prompt with project details
-        formatted_prompt = GEMINI_PROMPT.format(
-            name=name,
-            symbol=symbol.upper(),
-            sector=sector,
-            description=description
-        )
+        formatted_prompt = _format_prompt(name, project.symbol_upper, project.sector, project.description)
+        
+        # Unchanged prompts are served from the on-disk response cache
+        key = cache_key(model=GEMINI_MODEL, prompt=formatted_prompt)
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            logger.info(f"Using cached content for {name}")
+            return cached
         
         # Generate text with conservative settings - Fixed API call format
-        response = model.generate_content(
-            contents=formatted_prompt,  # Changed from 'prompt' to 'contents'
-            generation_config=genai.GenerationConfig(
-                temperature=0.2,
-                top_p=0.95,
-                top_k=40,
-                max_output_tokens=4000
-            ),
-        )
+        # Only quota/availability errors are retried, with jittered exponential backoff
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            await gemini_limiter.acquire_async()
+            try:
+                response = await model.generate_content_async(
+                    contents=formatted_prompt,  # Changed from 'prompt' to 'contents'
+                    generation_config=GENERATION_CONFIG,
+                )
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == GEMINI_MAX_RETRIES:
+                    raise
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) + random.uniform(0, 1)
+                logger.warning(f"Gemini unavailable for {name} ({type(e).__name__}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
         
         # Get the raw text content
         content = response.text
+        await asyncio.to_thread(response_cache.set, key, content)
         
         # Log a snippet of the response
         logger.info(f"Generated content for {name} (first 100 chars): {content[:100]}...")
@@ -356,8 +455,9 @@ def generate_gemini_content(name, symbol, sector, description):
         logger.error(f"Exception traceback: {traceback.format_exc()}")
         return None
 
-def create_project_json(content, symbol, name, cmc_data=None, scores=None):
+def create_project_json(content, project, cmc_data=None, scores=None):
     """Create the complete project JSON structure."""
+    name = project.name
     # Use provided scores or defaults
     growth_score = scores.get("growth", 50) if scores else 50
     earning_score = scores.get("earning", 50) if scores else 50
@@ -365,7 +465,7 @@ def create_project_json(content, symbol, name, cmc_data=None, scores=None):
     safety_score = scores.get("safety", 50) if scores else 50
     
     # Get market data
-    market_data = cmc_data.get(symbol, {}) if cmc_data else {}
+    market_data = cmc_data.get(project.symbol, {}) if cmc_data else {}
     
     # Create a description
     description = f"{name} is a cryptocurrency project in the {content.get('marketPosition', {}).get('description', 'blockchain')[:50]}..."
@@ -376,7 +476,7 @@ def create_project_json(content, symbol, name, cmc_data=None, scores=None):
         "coinId": PLACEHOLDER_COIN_ID,
         "name": name,
         "title": f"{name} Analysis for how3.io",
-        "logo": f"https://cryptologos.cc/logos/{name.lower().replace(' ', '-')}-{symbol}-logo.svg",
+        "logo": project.logo,
         "description": description,
         "assetOverview": {
             "valueGeneration": content["valueGeneration"],
@@ -437,143 +537,131 @@ def format_cvx_example():
         logger.error(f"Error formatting CVX example: {str(e)}")
         return None
 
-def main():
+async def process_project(i, total, project, cmc_data, scores_data, projects_log):
+    """Generate, parse and save one project. Returns True on success.
+
+    The project JSON is rebuilt every run so current scores and CMC data reach the output;
+    unchanged prompts are answered from the response cache instead of calling Gemini again.
+    """
+    name, symbol = project.name, project.symbol
+    try:
+        json_file = os.path.join(OUTPUT_DIR, f"{symbol}.json")
+        
+        logger.info(f"Processing project {i+1}/{total}: {name} ({symbol})")
+        
+        # 1. Generate content with Gemini
+        raw_content = await generate_gemini_content(project)
+        
+        # 2. Save the raw content for reference (file writes run in a worker
+        # thread so they overlap with in-flight Gemini requests)
+        raw_file = os.path.join(OUTPUT_DIR, f"{symbol}_raw.txt")
+        await asyncio.to_thread(write_text, raw_file, raw_content if raw_content else "Error generating content")
+        
+        # 3. Parse the content into structured sections
+        if raw_content:
+            structured_content = parse_text_to_sections(raw_content, symbol)
+            
+            # 4. Create full project JSON
+            project_json = create_project_json(
+                structured_content,
+                project,
+                cmc_data,
+                scores_data.get(symbol)
+            )
+            
+            # 5. Save individual project JSON
+            await asyncio.to_thread(save_json, json_file, project_json)
+            
+            # 6. Add to combined data
+            append_project(projects_log, symbol, project_json)
+            
+            logger.info(f"Successfully processed {name}")
+            return True
+        else:
+            # If content generation failed, use default structure
+            logger.warning(f"Using default content for {name}")
+            default_content = _fresh_default(symbol)
+            
+            # Create and save project JSON with default content
+            project_json = create_project_json(
+                default_content,
+                project,
+                cmc_data,
+                scores_data.get(symbol)
+            )
+            
+            await asyncio.to_thread(save_json, json_file, project_json)
+            
+            append_project(projects_log, symbol, project_json)
+            logger.warning(f"Saved default content for {name}")
+            return False
+        
+    except Exception as e:
+        logger.error(f"Error processing {name}: {str(e)}")
+        logger.error(f"Exception traceback: {traceback.format_exc()}")
+        return False
+
+async def main(force=False):
+    import pandas as pd
+    
     try:
+        init_gemini()
+        if force:
+            # Regenerate every project's content instead of reusing cached responses
+            response_cache.enabled = False
+        
         # Load CMC data
         cmc_data = load_cmc_data()
         logger.info(f"Loaded CMC data with {len(cmc_data)} entries")
         
         # Read CSV with project data
-        df = pd.read_csv("how3.io score sheet - Score Sheet (Master).csv")
+        # Only read the columns we use; text columns stay strings so numeric-looking symbols aren't coerced
+        df = pd.read_csv(
+            SCORE_SHEET_FILE,
+            usecols=SCORE_SHEET_COLUMNS,
+            dtype={"Project": str, "Symbol": str, "Market Sector": str},
+            engine=CSV_ENGINE
+        )
         logger.info(f"Loaded CSV with {len(df)} rows")
         
-        # Create a dictionary of scores
-        scores_data = {}
-        for _, row in df.iterrows():
-            try:
-                # Handle numeric symbols by converting to string
-                if pd.isna(row.get("Symbol")):
-                    continue  # Skip rows with missing symbols
-                
-                # Convert any numeric symbols to strings
-                symbol_val = row["Symbol"]
-                if isinstance(symbol_val, (int, float)):
-                    symbol = str(int(symbol_val)).lower()
-                else:
-                    symbol = str(symbol_val).lower()
-                
-                scores_data[symbol] = {
-                    "growth": float(row.get("UGS", 50)) if not pd.isna(row.get("UGS")) else 50,
-                    "earning": float(row.get("EQS", 50)) if not pd.isna(row.get("EQS")) else 50,
-                    "fairValue": float(row.get("FVS", 50)) if not pd.isna(row.get("FVS")) else 50,
-                    "safety": float(row.get("SS", 50)) if not pd.isna(row.get("SS")) else 50
-                }
-            except Exception as e:
-                logger.warning(f"Error processing scores for row with Symbol={row.get('Symbol')}: {str(e)}")
-                continue
-        
         # Filter the DataFrame to only include rows with valid symbols
-        filtered_df = df.dropna(subset=["Symbol"])
-        logger.info(f"Filtered to {len(filtered_df)} rows with valid symbols")
+        df = df.dropna(subset=["Symbol"]).copy()
+        logger.info(f"Filtered to {len(df)} rows with valid symbols")
+        
+        # Normalize symbols once
+        df["symbol"] = df["Symbol"].str.lower()
+        df["sector"] = df["Market Sector"].fillna("Cryptocurrency")
         
-        # Process all projects
-        all_projects = {}
-        success_count = 0
-        error_count = 0
+        # Create a dictionary of scores, defaulting missing values to 50
+        score_keys = []
+        for column, key in [("UGS", "growth"), ("EQS", "earning"), ("FVS", "fairValue"), ("SS", "safety")]:
+            df[key] = pd.to_numeric(df[column], errors="coerce").fillna(50.0)
+            score_keys.append(key)
+        scores_data = dict(zip(df["symbol"], df[score_keys].to_dict(orient="records")))
         
         # For debugging/testing, limit to a smaller set
-        # filtered_df = filtered_df.head(5)  # Comment this out for full processing
-        logger.info(f"Testing with first 5 projects")
+        # df = df.head(5)  # Comment this out for full processing
         
-        for i, row in filtered_df.iterrows():
-            try:
-                # Extract project details
-                name = row["Project"]
-                
-                # Handle numeric symbols by converting to string
-                symbol_val = row["Symbol"]
-                if isinstance(symbol_val, (int, float)):
-                    symbol = str(int(symbol_val)).lower()
-                else:
-                    symbol = str(symbol_val).lower()
-                
-                sector = str(row.get("Market Sector", "Cryptocurrency"))
-                description = f"{name} is a decentralized protocol in the {sector} sector."
-                
-                logger.info(f"Processing project {i+1}/{len(filtered_df)}: {name} ({symbol})")
-                
-                # 1. Generate content with Gemini
-                raw_content = generate_gemini_content(name, symbol, sector, description)
-                
-                # 2. Save the raw content for reference
-                raw_file = os.path.join(OUTPUT_DIR, f"{symbol}_raw.txt")
-                with open(raw_file, "w", encoding="utf-8") as f:
-                    f.write(raw_content if raw_content else "Error generating content")
-                
-                # 3. Parse the content into structured sections
-                if raw_content:
-                    structured_content = parse_text_to_sections(raw_content, symbol)
-                    
-                    # 4. Create full project JSON
-                    project_json = create_project_json(
-                        structured_content,
-                        symbol,
-                        name,
-                        cmc_data,
-                        scores_data.get(symbol)
-                    )
-                    
-                    # 5. Save individual project JSON
-                    json_file = os.path.join(OUTPUT_DIR, f"{symbol}.json")
-                    with open(json_file, "w", encoding="utf-8") as f:
-                        json.dump(project_json, f, indent=2)
-                    
-                    # 6. Add to combined data
-                    all_projects[symbol] = project_json
-                    
-                    logger.info(f"Successfully processed {name}")
-                    success_count += 1
-                else:
-                    # If content generation failed, use default structure
-                    logger.warning(f"Using default content for {name}")
-                    default_content = copy.deepcopy(DEFAULT_CONTENT)
-                    
-                    # Format headings with symbol
-                    for key in default_content:
-                        if isinstance(default_content[key], dict) and 'heading' in default_content[key]:
-                            default_content[key]['heading'] = default_content[key]['heading'].format(symbol=symbol.upper())
-                    
-                    # Create and save project JSON with default content
-                    project_json = create_project_json(
-                        default_content,
-                        symbol,
-                        name,
-                        cmc_data,
-                        scores_data.get(symbol)
-                    )
-                    
-                    json_file = os.path.join(OUTPUT_DIR, f"{symbol}.json")
-                    with open(json_file, "w", encoding="utf-8") as f:
-                        json.dump(project_json, f, indent=2)
-                    
-                    all_projects[symbol] = project_json
-                    logger.warning(f"Saved default content for {name}")
-                    error_count += 1
-                
-                # Save the combined data periodically
-                if (i + 1) % 5 == 0 or i == len(filtered_df) - 1:
-                    with open(os.path.join(OUTPUT_DIR, "all_projects.json"), "w", encoding="utf-8") as f:
-                        json.dump({"projects": all_projects}, f, indent=2)
-                    logger.info(f"Saved combined data with {len(all_projects)} projects")
-                
-                # Add delay to avoid rate limits
-                time.sleep(3)
-                
-            except Exception as e:
-                logger.error(f"Error processing {row.get('Project', 'Unknown')}: {str(e)}")
-                logger.error(f"Exception traceback: {traceback.format_exc()}")
-                error_count += 1
-                continue
+        total = len(df)
+        sem = asyncio.Semaphore(CONCURRENCY)
+        
+        # Process all projects, appending each result to the NDJSON log as it finishes
+        with open(ALL_PROJECTS_LOG, "ab") as projects_log:
+            async def process_row(i, project):
+                async with sem:
+                    return await process_project(i, total, project, cmc_data, scores_data, projects_log)
+            
+            rows = df[["Project", "symbol", "sector"]].itertuples(index=False, name=None)
+            projects = [ProjectContext.from_row(*row) for row in rows]
+            results = await asyncio.gather(*(process_row(i, project) for i, project in enumerate(projects)))
+        success_count = results.count(True)
+        error_count = len(results) - success_count
+        
+        # Merge the log into the combined file once, then start the next run fresh
+        all_projects = merge_projects_log()
+        save_json(ALL_PROJECTS_FILE, {"projects": all_projects})
+        os.remove(ALL_PROJECTS_LOG)
+        logger.info(f"Saved combined data with {len(all_projects)} projects")
         
         # Final statistics
         logger.info(f"Processing complete: {success_count} successes, {error_count} errors")
@@ -584,17 +672,14 @@ def main():
         logger.error(f"Exception traceback: {traceback.format_exc()}")
 
 if __name__ == "__main__":
-    import re  # Import here to avoid issues
-    
     # Check for '--example' flag
     import sys
     if len(sys.argv) > 1 and sys.argv[1] == '--example':
         # Just format the CVX example
         cvx_example = format_cvx_example()
         if cvx_example:
-            with open(os.path.join(OUTPUT_DIR, "cvx_example.json"), "w", encoding="utf-8") as f:
-                json.dump(cvx_example, f, indent=2)
+            save_json(os.path.join(OUTPUT_DIR, "cvx_example.json"), cvx_example)
             logger.info("Saved CVX example to cvx_example.json")
     else:
-        # Run the normal content generation
-        main()
\ No newline at end of file
+        # Run the normal content generation; --force bypasses the response cache
+        asyncio.run(main(force='--force' in sys.argv))
\ No newline at end of file
@@ -0,0 +1,51 @@
+# Shape of the generated section content, shared by the Gemini and Hugging Face generators.
+# Written in Gemini's schema dialect (upper-case type names); json_schema() converts it to
+# standard JSON Schema for backends such as text-generation-inference's JSON grammar.
+STRING = {"type": "STRING"}
+INTEGER = {"type": "INTEGER"}
+SECTION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"description": STRING, "title": STRING, "heading": STRING, "readTime": INTEGER, "dificultyTag": STRING},
+    "required": ["description", "title", "heading", "readTime", "dificultyTag"]
+}
+ITEMS_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"title": STRING, "description": STRING},
+        "required": ["title", "description"]
+    }
+}
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "valueGeneration": SECTION_SCHEMA,
+        "marketPosition": SECTION_SCHEMA,
+        "projectSize": SECTION_SCHEMA,
+        "RealWorldImpact": SECTION_SCHEMA,
+        "founders": SECTION_SCHEMA,
+        "problemSolving": SECTION_SCHEMA,
+        "strengths": ITEMS_SCHEMA,
+        "weaknesses": ITEMS_SCHEMA,
+        "whitepaper": {
+            "type": "OBJECT",
+            "properties": {"summary": STRING, "title": STRING, "lastUpdated": STRING, "readTime": INTEGER, "dificultyTag": STRING},
+            "required": ["summary", "title", "lastUpdated", "readTime", "dificultyTag"]
+        }
+    },
+    "required": [
+        "valueGeneration", "marketPosition", "projectSize", "RealWorldImpact", "founders",
+        "problemSolving", "strengths", "weaknesses", "whitepaper"
+    ]
+}
+
+def json_schema(schema):
+    """Copy of a Gemini-style schema with standard lower-case JSON Schema type names."""
+    if isinstance(schema, dict):
+        return {
+            key: value.lower() if key == "type" and isinstance(value, str) else json_schema(value)
+            for key, value in schema.items()
+        }
+    if isinstance(schema, list):
+        return [json_schema(item) for item in schema]
+    return schema
@@ -1,14 +1,24 @@
 import pandas as pd
 import requests
-import json
+import copy
+import orjson
 import uuid
 import os
+import importlib.util
 import time
-import re
+import math
+import sys
 import logging
+import asyncio
 from datetime import datetime
-import google.generativeai as genai
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from dotenv import load_dotenv
+from progress_log import progress_line, read_progress
+from gemini_client import (
+    CACHE_DIR, GEMINI_API_KEY, GEMINI_PROMPT, GENERATION_CONFIG, build_prompt, generate_async, parse_json,
+    requests_made, response_cache
+)
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,11 +29,17 @@ load_dotenv()
 
 # Configuration
 CMC_API_KEY = os.getenv("CMC_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 CMC_URL = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
-GEMINI_MODEL = "gemini-pro"
 PLACEHOLDER_COIN_ID = "00000000-0000-0000-0000-000000000000"
 OUTPUT_FILE = "crypto_data.json"
+PROJECT_DATA_FILE = "project_data.csv"
+PROJECT_DATA_COLUMNS = ["Project", "Symbol", "Market Sector", "UGS", "EQS", "FVS", "SS"]
+PROGRESS_FILE = "crypto_data.jsonl"  # One {"symbol", "project", "default"} line per finished row; lets a crashed run resume
+USE_BATCH_API = os.getenv("USE_BATCH_API", "0") == "1"  # Submit all prompts as one Gemini batch job
+GEMINI_BATCH_MODEL = os.getenv("GEMINI_BATCH_MODEL", "gemini-2.0-flash")
+BATCH_POLL_INTERVAL = 30  # Seconds between batch job status checks
+CONCURRENCY = 16  # Gemini requests in flight at once
+BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
 
 # Symbol mapping for known CoinMarketCap discrepancies
 SYMBOL_MAPPING = {
@@ -34,87 +50,8 @@ SYMBOL_MAPPING = {
     "venus usdt": "VUSDT"
 }
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel(GEMINI_MODEL)
-
-# Prompt for Gemini
-GEMINI_PROMPT = """
-You are creating content for how3.io, a crypto analytics platform for retail investors transitioning from traditional finance. Generate jargon-free, beginner-friendly content for a cryptocurrency project. Use simple language, avoid technical terms, and make it engaging. Below are the project details and the sections to generate.
-
-**Project Details**:
-- Name: {name}
-- Symbol: {symbol}
-- Sector: {sector}
-- Description: {description}
-
-**Sections to Generate**:
-1. **Value Generation (50-70 words)**:
-   - Explain how the project makes money or creates value for its users and token holders.
-   - Example: "Aave makes money by taking a small cut of the interest paid by borrowers on its lending platform. This interest is shared with lenders and the Aave team to keep the platform running and reward token holders."
-
-2. **Market Position (70-100 words)**:
-   - Highlight what the project is best known for and its main innovation.
-   - Example: "Uniswap is famous for letting people trade crypto without a middleman using 'liquidity pools.' Unlike regular exchanges, anyone can swap tokens instantly, making trading open to everyone. Its automated system is a game-changer for decentralized finance."
-
-3. **Project Size (70-100 words)**:
-   - Describe the project's importance in the crypto space (e.g., market rank, adoption).
-   - Do not include specific stats (these will be added separately).
-   - Example: "Aave is a top player in decentralized finance, known for its lending platform. It’s one of the biggest projects by the amount of money it manages, making it a trusted name in crypto."
-
-4. **Real World Impact (70-100 words)**:
-   - Explain where the project is used (regions, industries) and its influence.
-   - Example: "Aave is popular in places like the US, Europe, and Asia, where people use it to lend and borrow crypto. It’s a leader in decentralized finance, helping people access loans without banks."
-
-5. **Founders (70-100 words)**:
-   - Describe who created the project, when, and their background (use generic info if specific details are unavailable).
-   - Example: "Aave was started by Stani Kulechov in 2017, first as ETHLend. He’s a tech innovator who saw a need for better crypto lending. The team later grew, and now Aave is run by a community of token holders."
-
-6. **Problem Solving (70-100 words)**:
-   - Explain the main problem the project solves and why it matters.
-   - Example: "Aave makes crypto useful by letting people earn interest on their coins or borrow without selling them. Unlike old-school loans, Aave’s system is fast and doesn’t need a bank, making it easier for anyone to manage their money."
-
-7. **Strengths (3 strengths, each with a title and 2 sentences)**:
-   - List 3 key strengths that make the project appealing to investors.
-   - Example:
-     - **Top Security**: Aave has never been hacked, which builds trust. Its careful design keeps user money safe.
-     - **Lots of Options**: Aave lets users lend or borrow many types of crypto. This variety makes it more useful than other platforms.
-     - **New Ideas**: Aave created features like flash loans that others now copy. Its innovation keeps it ahead in crypto.
-
-8. **Weaknesses (3 weaknesses, each with a title and 2 sentences)**:
-   - List 3 potential concerns for investors.
-   - Example:
-     - **Hard to Understand**: Aave’s platform can be tricky for beginners. Terms like ‘collateral’ confuse new users.
-     - **Market Risks**: If crypto prices crash, Aave’s loans could face problems. This makes it sensitive to market swings.
-     - **Regulation Worries**: Governments might make new rules for crypto lending. This could limit how Aave works in some places.
-
-9. **Whitepaper Summary (100-200 words)**:
-   - Summarize the project’s core idea, innovation, token use, and problem solved.
-   - Use an analogy to make it relatable.
-   - Example: "Aave’s platform is like a digital bank where anyone can lend or borrow crypto without paperwork. Instead of dealing with a bank, users add their crypto to shared pools, and others can borrow from them instantly. The AAVE token lets people vote on how the platform runs and share its profits. Aave’s big idea is ‘flash loans,’ where you can borrow and repay in one go without upfront money. It solves the problem of slow, complicated loans by making everything fast and open to everyone. Think of it like a vending machine for loans – pop in your crypto, get cash, and it’s all automatic and secure."
-
-**Output Format**:
-Return a JSON object with the following structure:
-```json
-{
-  "valueGeneration": {"description": "...", "title": "Value Generation", "heading": "How {symbol} Generates Value", "readTime": 3, "dificultyTag": "Beginner friendly"},
-  "marketPosition": {"description": "...", "title": "Market Position", "heading": "What is {symbol} Best Known For", "readTime": 3, "dificultyTag": "Beginner friendly"},
-  "projectSize": {"description": "...", "title": "Project Size", "heading": "How Significant is {symbol} in the Crypto Space", "readTime": 3, "dificultyTag": "Beginner friendly"},
-  "RealWorldImpact": {"description": "...", "title": "Real World Impact", "heading": "Where Does {symbol} Have Influence", "readTime": 3, "dificultyTag": "Beginner friendly"},
-  "founders": {"description": "...", "title": "Founders", "heading": "Who Created {symbol}", "readTime": 3, "dificultyTag": "Beginner friendly"},
-  "problemSolving": {"description": "...", "title": "Problem Solving", "heading": "What challenges does {symbol} solve?", "readTime": 3, "dificultyTag": "Beginner friendly"},
-  "strengths": [
-    {"title": "...", "description": "..."},
-    ...
-  ],
-  "weaknesses": [
-    {"title": "...", "description": "..."},
-    ...
-  ],
-  "whitepaper": {"summary": "...", "title": "Whitepaper Summary", "lastUpdated": "2024-01-01", "readTime": 5, "dificultyTag": "Intermediate"}
-}
-```
-"""
+# (label, color) for each benchmark bar, in score order: growth, earning, fair value, safety
+BAR_COLORS = (("Growth", "#4CAF50"), ("Earning", "#2196F3"), ("Fair Value", "#FFC107"), ("Safety", "#9C27B0"))
 
 # Default content for fallback
 DEFAULT_HF_CONTENT = {
@@ -129,176 +66,265 @@ DEFAULT_HF_CONTENT = {
     "whitepaper": {"summary": "N/A", "title": "Whitepaper Summary", "lastUpdated": "2024-01-01", "readTime": 5, "dificultyTag": "Intermediate"}
 }
 
-# Function to clean and extract JSON from response
-def extract_json_from_response(response):
+def project_description(name, sector):
+    return f"{name} is a decentralized protocol in the {sector} sector, offering innovative solutions for decentralized applications and services."
+
+def content_from_response(text, name, symbol):
+    """Turn a raw Gemini response into section content, or None if it can't be parsed."""
+    # Log the raw response for debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Raw response for {name}: {text[:200]}...")
+
+    content = parse_json(text)
+    if content:
+        # Update headings with correct symbol
+        for key in ['valueGeneration', 'marketPosition', 'projectSize', 'RealWorldImpact', 'founders', 'problemSolving']:
+            if key in content and isinstance(content[key], dict) and 'heading' in content[key]:
+                content[key]['heading'] = content[key]['heading'].format(symbol=symbol.upper())
+        return content
+
+    logger.warning(f"Failed to extract valid JSON for {name}, using default content")
+    return None
+
+@lru_cache(maxsize=None)
+def default_content_for(symbol):
+    """Default content with headings filled in for symbol, built once per symbol. Treat as read-only."""
+    default_content = copy.deepcopy(DEFAULT_HF_CONTENT)
+    for key in ['valueGeneration', 'marketPosition', 'projectSize', 'RealWorldImpact', 'founders', 'problemSolving']:
+        if isinstance(default_content[key], dict) and 'heading' in default_content[key]:
+            default_content[key]['heading'] = default_content[key]['heading'].format(symbol=symbol.upper())
+    return default_content
+
+async def generate_gemini_content(name, symbol, sector, description):
+    """Return (content, is_default) for one project."""
+    text = await generate_async(name, symbol, sector, description)
+    content = content_from_response(text, name, symbol) if text else None
+    if content is None:
+        return default_content_for(symbol), True
+    return content, False
+
+def build_batch_requests(projects):
+    """Build one inline batch request per (name, symbol, sector) tuple, in order."""
+    return [
+        {
+            "contents": [{"role": "user", "parts": [{"text": build_prompt(name, symbol, sector, project_description(name, sector))}]}],
+            "config": {**GENERATION_CONFIG, "system_instruction": GEMINI_PROMPT}
+        }
+        for name, symbol, sector in projects
+    ]
+
+def run_batch_job(projects):
+    """Submit every prompt as a single Gemini batch job and return {symbol: response text}."""
     try:
-        # Remove any leading/trailing whitespace and common markdown markers
-        response = response.strip()
-        response = re.sub(r'```json\n|```', '', response)
-
-        # Attempt to extract JSON using regex
-        json_match = re.search(r'\{[\s\S]*?\}', response, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(0)
-            try:
-                # Attempt to parse the JSON string
-                return json.loads(json_str)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse JSON: {e}. Attempting to fix and retry.")
-                # Attempt to fix common JSON errors
-                json_str = re.sub(r',\s*([\]}])', r'\1', json_str)  # Remove trailing commas
-                json_str = re.sub(r'\\([\'"])', r'\1', json_str)  # Remove escaping backslashes
-                try:
-                    return json.loads(json_str)
-                except json.JSONDecodeError as e2:
-                    logger.error(f"Failed to parse JSON after fix: {e2}")
-                    logger.debug(f"Problematic JSON string: {json_str[:500]}...")
-                    return None
-        else:
-            logger.warning("No JSON object found in response.")
-            logger.debug(f"Response content: {response[:500]}...")
-            return None
+        # Batch mode lives in the newer google-genai SDK; only needed when USE_BATCH_API=1
+        from google import genai as genai_client
+        client = genai_client.Client(api_key=GEMINI_API_KEY)
+
+        job = client.batches.create(
+            model=GEMINI_BATCH_MODEL,
+            src=build_batch_requests(projects),
+            config={"display_name": "how3-final-json"}
+        )
+        logger.info(f"Submitted batch job {job.name} with {len(projects)} requests")
+
+        while job.state.name not in BATCH_DONE_STATES:
+            time.sleep(BATCH_POLL_INTERVAL)
+            job = client.batches.get(name=job.name)
+            logger.info(f"Batch job {job.name} state: {job.state.name}")
+
+        if job.state.name != "JOB_STATE_SUCCEEDED":
+            logger.error(f"Batch job {job.name} ended with state {job.state.name}")
+            return {}
+
+        # Inline responses come back in request order
+        results = {}
+        for (name, symbol, sector), item in zip(projects, job.dest.inlined_responses):
+            if item.response:
+                results[symbol] = item.response.text
+            else:
+                logger.warning(f"Batch request failed for {name}: {item.error}")
+        logger.info(f"Batch job returned {len(results)}/{len(projects)} responses")
+        return results
 
     except Exception as e:
-        logger.error(f"Unexpected error in JSON extraction: {str(e)}")
-        return None
-
-def generate_gemini_content(name, symbol, sector, description):
-    # Format the prompt with project details
-    prompt = GEMINI_PROMPT.format(
-        name=name,
-        symbol=symbol.upper(),
-        sector=sector,
-        description=description
-    )
-
+        logger.error(f"Error running Gemini batch job: {str(e)}")
+        return {}
+
+def score_value(row, column):
+    """Read a score from an itertuples row, treating missing or NaN values as 0."""
+    value = getattr(row, column, None)
+    if value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+        return 0
+    return float(value)
+
+def market_data_for(cmc_data, symbol):
+    """CMC key stats for a symbol, or N/A placeholders when the symbol is missing."""
+    return cmc_data.get(symbol) or {
+        "marketCap": "N/A",
+        "tradingVolume": "N/A",
+        "circulatingSupply": "N/A",
+        "totalSupply": "N/A"
+    }
+
+def row_fields(row):
+    """Pull the picklable (name, symbol, sector, scores) fields out of an itertuples row."""
+    # Use scores from the CSV with fallback to 0
+    scores = tuple(score_value(row, column) for column in ("UGS", "EQS", "FVS", "SS"))
+    return row.Project, row.Symbol.lower(), getattr(row, "Market_Sector", "Unknown"), scores
+
+def assemble_project(name, symbol, sector, scores, hf_content, market_data):
+    """Build the project dict from generated content, CMC stats and CSV scores. No I/O."""
+    ugs, eqs, fvs, ss = scores
+    return {
+        "id": str(uuid.uuid4()),
+        "coinId": PLACEHOLDER_COIN_ID,
+        "name": name.lower().replace(" ", "-"),
+        "title": f"{name} Analysis for how3.io",
+        "logo": f"https://cryptologos.cc/logos/{name.lower().replace(' ', '-')}-{symbol}-logo.svg",
+        "description": project_description(name, sector),
+        "assetOverview": {
+            "valueGeneration": hf_content["valueGeneration"],
+            "marketPosition": hf_content["marketPosition"],
+            "projectSize": {
+                **hf_content["projectSize"],
+                "keyStats": market_data
+            },
+            "RealWorldImpact": hf_content["RealWorldImpact"]
+        },
+        "projectNarrative": {
+            "founders": hf_content["founders"],
+            "problemSolving": hf_content["problemSolving"]
+        },
+        "researchAnalysis": {
+            "strengths": hf_content["strengths"],
+            "weaknesses": hf_content["weaknesses"]
+        },
+        "benchmarkScores": {
+            "growth": ugs,
+            "earning": eqs,
+            "fairValue": fvs,
+            "safety": ss,
+            "barData": [{"label": label, "value": value, "color": color} for (label, color), value in zip(BAR_COLORS, scores)]
+        },
+        "whitepaper": hf_content["whitepaper"],
+        "marketBenchmarkScores": {
+            "description": f"These scores compare {name}'s growth, revenue generation, valuation, and financial health to the overall cryptocurrency market. Higher scores indicate better performance and show {name}'s percentile in these areas. Compare scores across different cryptocurrencies to identify more attractive investments!"
+        }
+    }
+
+def build_project(fields, raw_text, market_data):
+    """Parse a batch response and assemble its project. Pure, so it can run in a worker process."""
+    name, symbol, sector, scores = fields
+    hf_content = content_from_response(raw_text, name, symbol)
+    is_default = hf_content is None
+    if is_default:
+        hf_content = default_content_for(symbol)
+    return symbol, assemble_project(name, symbol, sector, scores, hf_content, market_data), is_default
+
+def build_batch_projects(fields, batch_responses, cmc_data, progress):
+    """Assemble every batch-answered row across CPU cores, streaming results to the progress file."""
+    symbols = [f[1] for f in fields]
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+        for symbol, project, is_default in ex.map(
+            build_project,
+            fields,
+            [batch_responses[s] for s in symbols],
+            [market_data_for(cmc_data, s) for s in symbols],
+            chunksize=32,
+        ):
+            progress.write(progress_line(symbol, project, is_default))
+    progress.flush()
+    logger.info(f"Assembled {len(fields)} projects from batch responses")
+    return len(fields)
+
+async def process_row(i, total, row, cmc_data, sem, progress):
+    """Generate content for one CSV row and append its project to the progress file. Returns True on success."""
     try:
+        name, symbol, sector, scores = row_fields(row)
+
         # Generate content with Gemini
-        response = model.generate_content(prompt)
-
-        # Log the raw response for debugging
-        logger.debug(f"Raw response for {name}: {response.text[:200]}...")
-
-        # Extract and parse JSON
-        content = extract_json_from_response(response.text)
-        if content:
-            # Update headings with correct symbol
-            for key in ['valueGeneration', 'marketPosition', 'projectSize', 'RealWorldImpact', 'founders', 'problemSolving']:
-                if key in content and isinstance(content[key], dict) and 'heading' in content[key]:
-                    content[key]['heading'] = content[key]['heading'].format(symbol=symbol.upper())
-            return content
-
-        logger.warning(f"Failed to extract valid JSON for {name}, using default content")
-        default_content = DEFAULT_HF_CONTENT.copy()
-        for key in ['valueGeneration', 'marketPosition', 'projectSize', 'RealWorldImpact', 'founders', 'problemSolving']:
-            if isinstance(default_content[key], dict) and 'heading' in default_content[key]:
-                default_content[key]['heading'] = default_content[key]['heading'].format(symbol=symbol.upper())
-        return default_content
+        async with sem:
+            hf_content, is_default = await generate_gemini_content(name, symbol, sector, project_description(name, sector))
+
+        project = assemble_project(name, symbol, sector, scores, hf_content, market_data_for(cmc_data, symbol))
+        progress.write(progress_line(symbol, project, is_default))
+        progress.flush()
+        logger.info(f"Processed {i+1}/{total} - {symbol}")
+        return True
 
     except Exception as e:
-        logger.error(f"Error generating Gemini content for {name}: {str(e)}")
-        return DEFAULT_HF_CONTENT.copy()
+        logger.error(f"Error processing row {i} ({getattr(row, 'Project', 'Unknown')}): {str(e)}")
+        return False
+
+async def process_rows(df, cmc_data, progress):
+    """Process every row concurrently, with at most CONCURRENCY Gemini calls in flight."""
+    sem = asyncio.Semaphore(CONCURRENCY)
+    return await asyncio.gather(*(
+        process_row(i, len(df), row, cmc_data, sem, progress)
+        for i, row in enumerate(df.itertuples(index=False))
+    ))
 
 def main():
     try:
-        # Read CSV
-        df = pd.read_csv("project_data.csv")
+        # Read only the columns we use; the sheet also carries large per-row JSON columns
+        if importlib.util.find_spec("pyarrow"):
+            df = pd.read_csv(PROJECT_DATA_FILE, engine="pyarrow", usecols=PROJECT_DATA_COLUMNS, dtype_backend="pyarrow")
+        else:
+            df = pd.read_csv(PROJECT_DATA_FILE, usecols=PROJECT_DATA_COLUMNS)
         logger.info(f"Loaded CSV with {len(df)} rows")
 
-        # Load CMC data
-        with open("cmcdata.json", "r") as f:
-            cmc_data = json.load(f)
-        logger.info(f"Loaded CMC data for {len(cmc_data)} projects")
+        # Make column names valid attribute names for itertuples (e.g. "Market Sector" -> "Market_Sector")
+        df.columns = [c.replace(" ", "_") for c in df.columns]
 
-        # Generate JSON
-        result = {}
-        success_count = 0
-        error_count = 0
-
-        for i, row in df.iterrows():
-            try:
-                symbol = row["Symbol"].lower()
-                name = row["Project"]
-                sector = row.get("Market Sector", "Unknown")
-                description = f"{name} is a decentralized protocol in the {sector} sector, offering innovative solutions for decentralized applications and services."
-                project_id = str(uuid.uuid4())
-                coin_id = PLACEHOLDER_COIN_ID
-
-                # Get CMC data
-                market_data = cmc_data.get(symbol) or {
-                    "marketCap": "N/A",
-                    "tradingVolume": "N/A",
-                    "circulatingSupply": "N/A",
-                    "totalSupply": "N/A"
-                }
+        # Rows without a symbol or project name can't be generated; count them as failures
+        missing = df["Symbol"].isna() | df["Project"].isna()
+        for i in df.index[missing]:
+            logger.warning(f"Skipping row {i}: Missing symbol or project name")
+        df = df[~missing]
+        skipped = int(missing.sum())
 
-        # Generate content with Gemini
-        hf_content = generate_gemini_content(name, symbol, sector, description)
-
-        # Use scores from the CSV with fallback to 0
-        ugs = float(row.get("UGS", 0)) if pd.notna(row.get("UGS")) else 0
-        eqs = float(row.get("EQS", 0)) if pd.notna(row.get("EQS")) else 0
-        fvs = float(row.get("FVS", 0)) if pd.notna(row.get("FVS")) else 0
-        ss = float(row.get("SS", 0)) if pd.notna(row.get("SS")) else 0
-
-        # Check if hf_content is the default content
-        is_default_content = hf_content == DEFAULT_HF_CONTENT
-
-        # Generate JSON structure
-        project = {
-            "id": project_id,
-            "coinId": coin_id,
-            "name": name.lower().replace(" ", "-"),
-            "title": f"{name} Analysis for how3.io",
-            "logo": f"https://cryptologos.cc/logos/{name.lower().replace(' ', '-')}-{symbol}-logo.svg",
-            "description": description,
-            "assetOverview": {
-                "valueGeneration": hf_content["valueGeneration"] if not is_default_content else DEFAULT_HF_CONTENT["valueGeneration"],
-                "marketPosition": hf_content["marketPosition"] if not is_default_content else DEFAULT_HF_CONTENT["marketPosition"],
-                "projectSize": {
-                    **hf_content["projectSize"] if not is_default_content else DEFAULT_HF_CONTENT["projectSize"],
-                    "keyStats": market_data
-                },
-                "RealWorldImpact": hf_content["RealWorldImpact"] if not is_default_content else DEFAULT_HF_CONTENT["RealWorldImpact"]
-            },
-            "projectNarrative": {
-                "founders": hf_content["founders"] if not is_default_content else DEFAULT_HF_CONTENT["founders"],
-                "problemSolving": hf_content["problemSolving"] if not is_default_content else DEFAULT_HF_CONTENT["problemSolving"]
-            },
-            "researchAnalysis": {
-                "strengths": hf_content["strengths"] if not is_default_content else DEFAULT_HF_CONTENT["strengths"],
-                "weaknesses": hf_content["weaknesses"] if not is_default_content else DEFAULT_HF_CONTENT["weaknesses"]
-            },
-            "benchmarkScores": {
-                "growth": ugs,
-                "earning": eqs,
-                "fairValue": fvs,
-                "safety": ss,
-                "barData": [
-                    {"label": "Growth", "value": ugs, "color": "#4CAF50"},
-                    {"label": "Earning", "value": eqs, "color": "#2196F3"},
-                    {"label": "Fair Value", "value": fvs, "color": "#FFC107"},
-                    {"label": "Safety", "value": ss, "color": "#9C27B0"}
-                ]
-            },
-            "whitepaper": hf_content["whitepaper"] if not is_default_content else DEFAULT_HF_CONTENT["whitepaper"],
-            "marketBenchmarkScores": {
-                "description": f"These scores compare {name}'s growth, revenue generation, valuation, and financial health to the overall cryptocurrency market. Higher scores indicate better performance and show {name}'s percentile in these areas. Compare scores across different cryptocurrencies to identify more attractive investments!"
-            }
-        }
-        result[symbol] = project
-
-        logger.info(f"Processed {i+1}/{len(df)} - {symbol}")
-        success_count += 1
-
-            except Exception as e:
-                logger.error(f"Error processing row {i} ({row.get('Project', 'Unknown')}): {str(e)}")
-                error_count += 1
-                continue
+        # Load CMC data
+        with open("cmcdata.json", "rb") as f:
+            cmc_data = orjson.loads(f.read())
+        logger.info(f"Loaded CMC data for {len(cmc_data)} projects")
 
-        # Save final output
-        with open(OUTPUT_FILE, "w") as f:
-            json.dump(result, f, indent=4)
+        # Resume: rows finished by an earlier run are already in the progress file;
+        # rows it saved with default content are retried
+        _, done = read_progress(PROGRESS_FILE)
+        if done:
+            df = df[~df["Symbol"].str.lower().isin(done)]
+            logger.info(f"Resuming with {len(done)} projects already done, {len(df)} remaining")
+
+        # In batch mode every prompt is answered up front; rows missing from the
+        # batch output fall back to a per-row request
+        batch_responses = {}
+        if USE_BATCH_API:
+            projects = [(row.Project, row.Symbol.lower(), getattr(row, "Market_Sector", "Unknown")) for row in df.itertuples(index=False)]
+            batch_responses = run_batch_job(projects)
+
+        # Generate JSON, streaming each finished project to the progress file.
+        # Batch-answered rows need no network, so they are parsed and assembled
+        # in a process pool; the rest go through per-row Gemini requests
+        started = time.monotonic()
+        batch_count = 0
+        with open(PROGRESS_FILE, "ab") as progress:
+            if batch_responses:
+                answered = df["Symbol"].str.lower().isin(batch_responses)
+                fields = [row_fields(row) for row in df[answered].itertuples(index=False)]
+                batch_count = build_batch_projects(fields, batch_responses, cmc_data, progress)
+                df = df[~answered]
+            results = asyncio.run(process_rows(df, cmc_data, progress))
+        elapsed = max(time.monotonic() - started, 1e-6)
+        logger.info(f"Made {requests_made()} Gemini requests in {elapsed:.0f}s ({requests_made() / elapsed * 60:.1f}/min)")
+
+        success_count = batch_count + results.count(True)
+        error_count = len(results) - results.count(True) + skipped
+
+        # Save final output by consolidating the progress file, then start the next run fresh
+        result, _ = read_progress(PROGRESS_FILE)
+        with open(OUTPUT_FILE, "wb") as f:
+            f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+        os.remove(PROGRESS_FILE)
 
         logger.info(f"Successfully generated data for {success_count} cryptocurrencies")
         logger.info(f"Failed to process {error_count} cryptocurrencies")
@@ -307,4 +333,10 @@ def main():
         logger.error(f"Fatal error in main: {str(e)}")
 
 if __name__ == "__main__":
+    # --invalidate empties the response cache first; --no-cache bypasses it for this run
+    if "--invalidate" in sys.argv:
+        removed = response_cache.clear()
+        logger.info(f"Removed {removed} cached responses from {CACHE_DIR}")
+    if "--no-cache" in sys.argv:
+        response_cache.enabled = False
     main()
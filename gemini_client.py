@@ -0,0 +1,452 @@
+import json
+import orjson
+import os
+import re
+import string
+import time
+import random
+import logging
+import asyncio
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from dotenv import load_dotenv
+from rate_limiter import GeminiRateLimiter
+from response_cache import ResponseCache, cache_key
+from content_schema import RESPONSE_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Configuration
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+# Older models reject system_instruction and JSON mode; for these the instructions are sent
+# in the prompt and the full variant is parsed from plain text
+LEGACY_MODELS = frozenset({"gemini-pro", "gemini-1.0-pro"})
+LEGACY_MODEL = GEMINI_MODEL in LEGACY_MODELS
+CACHE_DIR = ".gemini_cache"
+CACHE_MAX_AGE = 7 * 86400  # Seconds before a cached response is regenerated
+PROMPT_VERSION = "1"  # Bump when prompts or generation configs change in ways the cache key can't see
+# Account quotas; the limiter keeps each at 80% to leave headroom
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "60"))  # Requests per minute
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "1000000"))  # Input tokens per minute
+GEMINI_RPD = int(os.getenv("GEMINI_RPD", "10000"))  # Requests per day
+GEMINI_MAX_RETRIES = 5  # Retries on quota/availability errors before giving up
+RETRY_BASE_DELAY = 1.0  # Seconds; doubles on each retry
+RETRY_MAX_DELAY = 60.0
+RETRYABLE_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.ServiceUnavailable)
+MAX_OUTPUT_TOKENS = 1800  # Simple variant: ~700-900 words of section content plus headers
+RETRY_MAX_OUTPUT_TOKENS = 2400  # Used once if a simple response is cut off at MAX_OUTPUT_TOKENS
+MERGE_SIZE = 4  # Projects per merged simple-variant request
+MERGED_MAX_OUTPUT_TOKENS = 8192  # Model output ceiling for a merged request
+
+# Configure Gemini
+genai.configure(api_key=GEMINI_API_KEY)
+_limiter = GeminiRateLimiter(GEMINI_RPM, GEMINI_TPM, GEMINI_RPD)
+_request_count = 0
+_inflight = {}  # cache key -> future for requests currently being made by generate_async
+response_cache = ResponseCache(CACHE_DIR, max_age=CACHE_MAX_AGE)
+
+# Full prompt, used by final_json_generator. The instructions are identical for every
+# project and sent as the model's system_instruction so the server can reuse its prefix
+# cache; only the short project details message differs per row. {symbol} in the example
+# headings is filled in afterwards.
+GEMINI_PROMPT = """
+You are creating content for how3.io, a crypto analytics platform for retail investors transitioning from traditional finance. Generate jargon-free, beginner-friendly content for a cryptocurrency project. Use simple language, avoid technical terms, and make it engaging. Below are the sections to generate, followed by the project details.
+
+**Sections to Generate**:
+1. **Value Generation (50-70 words)**:
+   - Explain how the project makes money or creates value for its users and token holders.
+   - Example: "Aave makes money by taking a small cut of the interest paid by borrowers on its lending platform. This interest is shared with lenders and the Aave team to keep the platform running and reward token holders."
+
+2. **Market Position (70-100 words)**:
+   - Highlight what the project is best known for and its main innovation.
+   - Example: "Uniswap is famous for letting people trade crypto without a middleman using 'liquidity pools.' Unlike regular exchanges, anyone can swap tokens instantly, making trading open to everyone. Its automated system is a game-changer for decentralized finance."
+
+3. **Project Size (70-100 words)**:
+   - Describe the project's importance in the crypto space (e.g., market rank, adoption).
+   - Do not include specific stats (these will be added separately).
+   - Example: "Aave is a top player in decentralized finance, known for its lending platform. It’s one of the biggest projects by the amount of money it manages, making it a trusted name in crypto."
+
+4. **Real World Impact (70-100 words)**:
+   - Explain where the project is used (regions, industries) and its influence.
+   - Example: "Aave is popular in places like the US, Europe, and Asia, where people use it to lend and borrow crypto. It’s a leader in decentralized finance, helping people access loans without banks."
+
+5. **Founders (70-100 words)**:
+   - Describe who created the project, when, and their background (use generic info if specific details are unavailable).
+   - Example: "Aave was started by Stani Kulechov in 2017, first as ETHLend. He’s a tech innovator who saw a need for better crypto lending. The team later grew, and now Aave is run by a community of token holders."
+
+6. **Problem Solving (70-100 words)**:
+   - Explain the main problem the project solves and why it matters.
+   - Example: "Aave makes crypto useful by letting people earn interest on their coins or borrow without selling them. Unlike old-school loans, Aave’s system is fast and doesn’t need a bank, making it easier for anyone to manage their money."
+
+7. **Strengths (3 strengths, each with a title and 2 sentences)**:
+   - List 3 key strengths that make the project appealing to investors.
+   - Example:
+     - **Top Security**: Aave has never been hacked, which builds trust. Its careful design keeps user money safe.
+     - **Lots of Options**: Aave lets users lend or borrow many types of crypto. This variety makes it more useful than other platforms.
+     - **New Ideas**: Aave created features like flash loans that others now copy. Its innovation keeps it ahead in crypto.
+
+8. **Weaknesses (3 weaknesses, each with a title and 2 sentences)**:
+   - List 3 potential concerns for investors.
+   - Example:
+     - **Hard to Understand**: Aave’s platform can be tricky for beginners. Terms like ‘collateral’ confuse new users.
+     - **Market Risks**: If crypto prices crash, Aave’s loans could face problems. This makes it sensitive to market swings.
+     - **Regulation Worries**: Governments might make new rules for crypto lending. This could limit how Aave works in some places.
+
+9. **Whitepaper Summary (100-200 words)**:
+   - Summarize the project’s core idea, innovation, token use, and problem solved.
+   - Use an analogy to make it relatable.
+   - Example: "Aave’s platform is like a digital bank where anyone can lend or borrow crypto without paperwork. Instead of dealing with a bank, users add their crypto to shared pools, and others can borrow from them instantly. The AAVE token lets people vote on how the platform runs and share its profits. Aave’s big idea is ‘flash loans,’ where you can borrow and repay in one go without upfront money. It solves the problem of slow, complicated loans by making everything fast and open to everyone. Think of it like a vending machine for loans – pop in your crypto, get cash, and it’s all automatic and secure."
+
+**Output Format**:
+Return a JSON object with the following structure:
+```json
+{
+  "valueGeneration": {"description": "...", "title": "Value Generation", "heading": "How {symbol} Generates Value", "readTime": 3, "dificultyTag": "Beginner friendly"},
+  "marketPosition": {"description": "...", "title": "Market Position", "heading": "What is {symbol} Best Known For", "readTime": 3, "dificultyTag": "Beginner friendly"},
+  "projectSize": {"description": "...", "title": "Project Size", "heading": "How Significant is {symbol} in the Crypto Space", "readTime": 3, "dificultyTag": "Beginner friendly"},
+  "RealWorldImpact": {"description": "...", "title": "Real World Impact", "heading": "Where Does {symbol} Have Influence", "readTime": 3, "dificultyTag": "Beginner friendly"},
+  "founders": {"description": "...", "title": "Founders", "heading": "Who Created {symbol}", "readTime": 3, "dificultyTag": "Beginner friendly"},
+  "problemSolving": {"description": "...", "title": "Problem Solving", "heading": "What challenges does {symbol} solve?", "readTime": 3, "dificultyTag": "Beginner friendly"},
+  "strengths": [
+    {"title": "...", "description": "..."},
+    ...
+  ],
+  "weaknesses": [
+    {"title": "...", "description": "..."},
+    ...
+  ],
+  "whitepaper": {"summary": "...", "title": "Whitepaper Summary", "lastUpdated": "2024-01-01", "readTime": 5, "dificultyTag": "Intermediate"}
+}
+```
+"""
+
+PROJECT_DETAILS_TEMPLATE = string.Template("""**Project Details**:
+- Name: $name
+- Symbol: $symbol
+- Sector: $sector
+- Description: $description
+""")
+
+# Simplified prompt, used by gemini_content_generator; plain text with section headers
+# instead of JSON to avoid formatting issues
+SIMPLE_PROMPT = """
+You are creating content for how3.io, a crypto analytics platform for retail investors transitioning from traditional finance. Generate jargon-free, beginner-friendly content for a cryptocurrency project. Use simple language, avoid technical terms, and make it engaging. The project details follow the sections.
+
+For each section below, provide concise and informative content:
+
+1. **Value Generation (50-70 words)**:
+   Explain how the project makes money or creates value for its users and token holders.
+
+2. **Market Position (70-100 words)**:
+   Highlight what the project is best known for and its main innovation.
+
+3. **Project Size (70-100 words)**:
+   Describe the project's importance in the crypto space (e.g., market rank, adoption).
+
+4. **Real World Impact (70-100 words)**:
+   Explain where the project is used (regions, industries) and its influence.
+
+5. **Founders (70-100 words)**:
+   Describe who created the project, when, and their background.
+
+6. **Problem Solving (70-100 words)**:
+   Explain the main problem the project solves and why it matters.
+
+7. **Strengths**:
+   List 3 key strengths, each with a title and 2 sentences of description.
+
+8. **Weaknesses**:
+   List 3 potential concerns, each with a title and 2 sentences of description.
+
+9. **Whitepaper Summary (100-200 words)**:
+   Summarize the project's core idea, innovation, token use, and problem solved.
+
+FORMAT YOUR RESPONSE WITH CLEAR SECTION HEADERS.
+"""
+
+# Appended to the simple prompt when several projects share one request
+MERGED_PROMPT = SIMPLE_PROMPT + """
+Several projects are given. Answer each one in turn, in the order given. Start each answer
+with a line containing only the project's symbol between === markers, for example:
+=== AAVE ===
+Write nothing before the first marker line.
+"""
+PROJECT_MARKER_RE = re.compile(r'^=== *(\S+?) *===[ \t]*$', re.MULTILINE)
+
+# Structured output; Gemini is constrained to emit JSON of exactly RESPONSE_SCHEMA's shape
+GENERATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": RESPONSE_SCHEMA,
+    "temperature": 0.2
+}
+
+def simple_generation_config(max_output_tokens):
+    # Greedy decoding so identical prompts give identical output
+    return genai.GenerationConfig(
+        temperature=0.0,
+        top_p=1.0,
+        top_k=1,
+        max_output_tokens=max_output_tokens
+    )
+
+# variant -> (instructions, generation config, retry config if cut off at the token cap)
+VARIANTS = {
+    "full": (GEMINI_PROMPT, {"temperature": GENERATION_CONFIG["temperature"]} if LEGACY_MODEL else GENERATION_CONFIG, None),
+    "simple": (SIMPLE_PROMPT, simple_generation_config(MAX_OUTPUT_TOKENS), simple_generation_config(RETRY_MAX_OUTPUT_TOKENS)),
+    "merged": (MERGED_PROMPT, simple_generation_config(min(MAX_OUTPUT_TOKENS * MERGE_SIZE, MERGED_MAX_OUTPUT_TOKENS)), None),
+}
+
+# One model per variant, created once; the static instructions are its system_instruction
+# so every request shares the same prefix and only the project details vary
+_MODELS = {
+    variant: genai.GenerativeModel(GEMINI_MODEL, system_instruction=None if LEGACY_MODEL else instructions)
+    for variant, (instructions, _, _) in VARIANTS.items()
+}
+
+def model_input(variant, prompt):
+    """What is sent to the model: the details alone, or prefixed with the instructions on legacy models."""
+    return f"{VARIANTS[variant][0]}\n\n{prompt}" if LEGACY_MODEL else prompt
+
+# Patterns used by extract_json_from_response
+JSON_FENCE_RE = re.compile(r'```json\n|```')
+TRAILING_COMMA_RE = re.compile(r',\s*([\]}])')
+ESCAPED_QUOTE_RE = re.compile(r'\\([\'"])')
+JSON_DECODER = json.JSONDecoder()
+
+def decode_first_object(text, start):
+    """Decode the JSON object starting at text[start], or return None."""
+    try:
+        return JSON_DECODER.raw_decode(text, start)[0]
+    except json.JSONDecodeError:
+        return None
+
+# Function to clean and extract JSON from response
+def extract_json_from_response(response):
+    try:
+        # Remove any leading/trailing whitespace and common markdown markers
+        response = JSON_FENCE_RE.sub('', response.strip())
+
+        start = response.find('{')
+        if start == -1:
+            logger.warning("No JSON object found in response.")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Response content: {response[:500]}...")
+            return None
+
+        # Fast path: the response is just the object, optionally followed by text
+        end = response.rfind('}')
+        try:
+            return orjson.loads(response[start:end + 1])
+        except orjson.JSONDecodeError:
+            pass
+
+        # raw_decode parses one balanced object and ignores whatever follows it
+        content = decode_first_object(response, start)
+        if content is not None:
+            return content
+
+        # Fix common JSON errors once (trailing commas, escaped quotes) and retry
+        logger.warning("Failed to parse JSON. Attempting to fix and retry.")
+        fixed = ESCAPED_QUOTE_RE.sub(r'\1', TRAILING_COMMA_RE.sub(r'\1', response[start:]))
+        content = decode_first_object(fixed, 0)
+        if content is not None:
+            return content
+
+        # The first brace may be stray text; try each later one in turn
+        start = response.find('{', start + 1)
+        while start != -1:
+            content = decode_first_object(response, start)
+            if content is not None:
+                return content
+            start = response.find('{', start + 1)
+
+        logger.error("Failed to parse JSON after fix")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Problematic response: {response[:500]}...")
+        return None
+
+    except Exception as e:
+        logger.error(f"Unexpected error in JSON extraction: {str(e)}")
+        return None
+
+def parse_json(text):
+    """Parse a full-variant response: plain JSON when schema-constrained, else via the extractor."""
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        return extract_json_from_response(text)
+
+def build_prompt(name, symbol, sector, description):
+    """Return the per-project part of the prompt; the instructions go in system_instruction."""
+    return PROJECT_DETAILS_TEMPLATE.substitute(
+        name=name,
+        symbol=symbol.upper(),
+        sector=sector,
+        description=description
+    )
+
+def response_key(variant, prompt):
+    """Cache key for a prompt sent with the given variant's instructions."""
+    return cache_key(model=GEMINI_MODEL, version=PROMPT_VERSION, instructions=VARIANTS[variant][0], prompt=prompt)
+
+def split_merged(text):
+    """Split a merged response into {SYMBOL: answer} on its === SYMBOL === marker lines."""
+    pieces = PROJECT_MARKER_RE.split(text)
+    return {pieces[i].upper(): pieces[i + 1].strip() for i in range(1, len(pieces) - 1, 2)}
+
+def requests_made():
+    """Number of Gemini requests sent by this process, including retries."""
+    return _request_count
+
+def estimate_tokens(variant, prompt):
+    # Roughly four characters per token for English text; the system instruction counts too
+    return (len(VARIANTS[variant][0]) + len(prompt)) // 4
+
+def hit_token_limit(response):
+    return bool(response.candidates) and response.candidates[0].finish_reason.name == "MAX_TOKENS"
+
+def backoff_delay(attempt):
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) + random.uniform(0, 1)
+
+async def request_gemini_async(variant, prompt, config, name):
+    """Call Gemini under the rate limiter, retrying quota/availability errors with backoff."""
+    global _request_count
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        await _limiter.acquire_async(estimate_tokens(variant, prompt))
+        _request_count += 1
+        try:
+            return await _MODELS[variant].generate_content_async(model_input(variant, prompt), generation_config=config)
+        except RETRYABLE_ERRORS as e:
+            if attempt == GEMINI_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"Gemini unavailable for {name} ({type(e).__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+def request_gemini(variant, prompt, config, name):
+    """Blocking counterpart of request_gemini_async."""
+    global _request_count
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        _limiter.acquire(estimate_tokens(variant, prompt))
+        _request_count += 1
+        try:
+            return _MODELS[variant].generate_content(model_input(variant, prompt), generation_config=config)
+        except RETRYABLE_ERRORS as e:
+            if attempt == GEMINI_MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(f"Gemini unavailable for {name} ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def store_response(key, text, name, variant):
+    """Cache a response unless it is a full-variant answer that doesn't parse, so it is retried next run."""
+    if variant == "full" and parse_json(text) is None:
+        logger.warning(f"Not caching unparseable response for {name}")
+    else:
+        response_cache.set(key, text)
+    return text
+
+async def generate_async(name, symbol, sector, description, variant="full"):
+    """Return the Gemini response text for one project, or None on failure."""
+    try:
+        prompt = build_prompt(name, symbol, sector, description)
+        _, config, retry_config = VARIANTS[variant]
+
+        # Unchanged prompts are answered from the on-disk cache
+        key = response_key(variant, prompt)
+        cached = response_cache.get(key)
+        if cached is not None:
+            logger.info(f"Using cached content for {name}")
+            return cached
+
+        # Identical prompts already being requested share that one call
+        waiter = _inflight.get(key)
+        if waiter is not None:
+            logger.info(f"Waiting on in-flight request for {name}")
+            return await waiter
+
+        waiter = _inflight[key] = asyncio.get_running_loop().create_future()
+        text = None
+        try:
+            response = await request_gemini_async(variant, prompt, config, name)
+            if retry_config and hit_token_limit(response):
+                logger.warning(f"Response for {name} hit the token cap, retrying with a higher limit")
+                response = await request_gemini_async(variant, prompt, retry_config, name)
+            text = store_response(key, response.text, name, variant)
+            return text
+        finally:
+            # Waiters get None if this request failed
+            del _inflight[key]
+            waiter.set_result(text)
+
+    except Exception as e:
+        logger.error(f"Error generating Gemini content for {name}: {str(e)}")
+        return None
+
+def generate(name, symbol, sector, description, variant="full"):
+    """Blocking counterpart of generate_async, for scripts without an event loop."""
+    try:
+        prompt = build_prompt(name, symbol, sector, description)
+        _, config, retry_config = VARIANTS[variant]
+
+        # Unchanged prompts are answered from the on-disk cache
+        key = response_key(variant, prompt)
+        cached = response_cache.get(key)
+        if cached is not None:
+            logger.info(f"Using cached content for {name}")
+            return cached
+
+        response = request_gemini(variant, prompt, config, name)
+        if retry_config and hit_token_limit(response):
+            logger.warning(f"Response for {name} hit the token cap, retrying with a higher limit")
+            response = request_gemini(variant, prompt, retry_config, name)
+        return store_response(key, response.text, name, variant)
+
+    except Exception as e:
+        logger.error(f"Error generating Gemini content for {name}: {str(e)}")
+        return None
+
+async def generate_many_async(projects):
+    """Simple-variant text for several (name, symbol, sector, description) projects, in input order.
+
+    Uncached projects are sent together in one merged request and the answer is
+    split per project; any missing from it fall back to a single request. Each
+    answer is cached under its single-project key. Entries are None on failure.
+    """
+    results = [None] * len(projects)
+    misses = []
+    for i, (name, symbol, sector, description) in enumerate(projects):
+        cached = response_cache.get(response_key("simple", build_prompt(name, symbol, sector, description)))
+        if cached is not None:
+            logger.info(f"Using cached content for {name}")
+            results[i] = cached
+        else:
+            misses.append(i)
+
+    if len(misses) > 1:
+        names = ", ".join(projects[i][0] for i in misses)
+        try:
+            prompt = "\n".join(build_prompt(*projects[i]) for i in misses)
+            response = await request_gemini_async("merged", prompt, VARIANTS["merged"][1], names)
+            answers = split_merged(response.text)
+            if hit_token_limit(response) and answers:
+                # The output cap cut off the last answer; its project is requested on its own below
+                truncated = next(reversed(answers))
+                logger.warning(f"Merged response for {names} hit the token cap, dropping the answer for {truncated}")
+                del answers[truncated]
+            for i in misses:
+                name, symbol, sector, description = projects[i]
+                text = answers.get(symbol.upper())
+                if text:
+                    results[i] = store_response(response_key("simple", build_prompt(name, symbol, sector, description)), text, name, "simple")
+        except Exception as e:
+            logger.error(f"Error generating merged Gemini content for {names}: {str(e)}")
+
+    for i in misses:
+        if results[i] is None:
+            results[i] = await generate_async(*projects[i], variant="simple")
+    return results
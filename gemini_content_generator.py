@@ -1,115 +1,39 @@
 import pandas as pd
 import requests
 import json
+import orjson
 import os
-import time
 import logging
+import re
+import asyncio
 import traceback
 from datetime import datetime
-import google.generativeai as genai
-from dotenv import load_dotenv
+from gemini_client import MERGE_SIZE, generate_many_async
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Load environment variables from .env file
-load_dotenv()
-
 # Configuration
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_MODEL = "gemini-pro"
 OUTPUT_DIR = "generated_content"
+OUTPUT_FILE = os.path.join(OUTPUT_DIR, "gemini_content.jsonl")  # One {"symbol", "content"} line per project
+PROJECT_DATA_FILE = "project_data.csv"
+# Only these columns are used; the sheet also carries large per-row JSON columns
+PROJECT_DATA_DTYPES = {"Project": "string", "Symbol": "string", "Market Sector": "string"}
+CONCURRENCY = 10  # Gemini requests in flight at once
+
+# Text between the Value Generation and Market Position headers
+VALUE_GENERATION_RE = re.compile(r'(?:Value Generation|VALUE GENERATION).*?:(.*?)(?:Market Position|MARKET POSITION)', re.DOTALL | re.IGNORECASE)
 
 # Create output directory if it doesn't exist
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# Configure Gemini
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel(GEMINI_MODEL)
-
-# Prompt for Gemini - Simplified to avoid JSON formatting issues
-GEMINI_PROMPT = """
-You are creating content for how3.io, a crypto analytics platform for retail investors transitioning from traditional finance. Generate jargon-free, beginner-friendly content for a cryptocurrency project. Use simple language, avoid technical terms, and make it engaging.
-
-**Project Details**:
-- Name: {name}
-- Symbol: {symbol}
-- Sector: {sector}
-- Description: {description}
-
-For each section below, provide concise and informative content:
-
-1. **Value Generation (50-70 words)**:
-   Explain how the project makes money or creates value for its users and token holders.
-
-2. **Market Position (70-100 words)**:
-   Highlight what the project is best known for and its main innovation.
-
-3. **Project Size (70-100 words)**:
-   Describe the project's importance in the crypto space (e.g., market rank, adoption).
-
-4. **Real World Impact (70-100 words)**:
-   Explain where the project is used (regions, industries) and its influence.
-
-5. **Founders (70-100 words)**:
-   Describe who created the project, when, and their background.
-
-6. **Problem Solving (70-100 words)**:
-   Explain the main problem the project solves and why it matters.
-
-7. **Strengths**:
-   List 3 key strengths, each with a title and 2 sentences of description.
-
-8. **Weaknesses**:
-   List 3 potential concerns, each with a title and 2 sentences of description.
-
-9. **Whitepaper Summary (100-200 words)**:
-   Summarize the project's core idea, innovation, token use, and problem solved.
-
-FORMAT YOUR RESPONSE WITH CLEAR SECTION HEADERS.
-"""
-
-def generate_gemini_content(name, symbol, sector, description):
-    try:
-        # Format the prompt with project details
-        prompt = GEMINI_PROMPT.format(
-            name=name,
-            symbol=symbol.upper(),
-            sector=sector,
-            description=description
-        )
-        
-        # Generate text with conservative settings
-        response = model.generate_content(
-            prompt=prompt,
-            generation_config=genai.GenerationConfig(
-                temperature=0.2,
-                top_p=0.95,
-                top_k=40,
-                max_output_tokens=4000
-            ),
-        )
-        
-        # Get the raw text content
-        content = response.text
-        
-        # Log a snippet of the response
-        logger.info(f"Generated content for {name} (first 100 chars): {content[:100]}...")
-        
-        # Return the plain text content
-        return content
-    except Exception as e:
-        logger.error(f"Error generating content for {name}: {str(e)}")
-        logger.error(f"Exception traceback: {traceback.format_exc()}")
-        return None
-
 def parse_text_to_sections(text):
     """Parse the text content into sections. This is a simple version that can be expanded."""
     sections = {}
     
     # Find Value Generation section
-    value_gen_match = re.search(r'(?:Value Generation|VALUE GENERATION).*?:(.*?)(?:Market Position|MARKET POSITION)', text, re.DOTALL | re.IGNORECASE)
+    value_gen_match = VALUE_GENERATION_RE.search(text)
     if value_gen_match:
         sections['valueGeneration'] = {
             "description": value_gen_match.group(1).strip(),
@@ -124,48 +48,113 @@ def parse_text_to_sections(text):
     
     return sections
 
+def read_done_symbols():
+    """Symbols already written to OUTPUT_FILE by an earlier (possibly interrupted) run."""
+    done = set()
+    if not os.path.exists(OUTPUT_FILE):
+        return done
+    with open(OUTPUT_FILE, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                done.add(orjson.loads(line)["symbol"])
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                logger.warning(f"Skipping truncated line in {OUTPUT_FILE}")
+    return done
+
+def save_content(name, symbol, content, out):
+    """Append the raw content for one project to the output file. Returns True on success."""
+    if not content:
+        logger.warning(f"No content generated for {name}")
+        return False
+
+    logger.info(f"Generated content for {name} (first 100 chars): {content[:100]}...")
+
+    # Save the raw text content for manual verification
+    out.write(orjson.dumps({"symbol": symbol, "content": content}) + b"\n")
+    out.flush()  # So a crash can't lose finished projects the resume check needs to see
+    logger.info(f"Saved raw content for {name} to {OUTPUT_FILE}")
+    return True
+
+def merge_groups(rows):
+    """Split rows into groups of up to MERGE_SIZE. Merged answers are keyed by symbol,
+    so rows sharing a symbol are never put in the same group."""
+    groups = []
+    for row in rows:
+        symbol = str(row.Symbol).lower()
+        for group, symbols in groups:
+            if len(group) < MERGE_SIZE and symbol not in symbols:
+                break
+        else:
+            group, symbols = [], set()
+            groups.append((group, symbols))
+        group.append(row)
+        symbols.add(symbol)
+    return [group for group, _ in groups]
+
+async def generate_group(rows, sem, out):
+    """Generate content for up to MERGE_SIZE rows in one merged request. Returns a success flag per row."""
+    results = [False] * len(rows)
+
+    # Check each row on its own so one bad row only fails itself
+    projects = []
+    indexes = []
+    for i, row in enumerate(rows):
+        try:
+            name = row.Project
+            sector = getattr(row, "Market_Sector", "Unknown")
+            description = f"{name} is a decentralized protocol in the {sector} sector."
+            projects.append((name, row.Symbol.lower(), sector, description))
+            indexes.append(i)
+        except Exception as e:
+            logger.error(f"Error processing {getattr(row, 'Project', 'Unknown')}: {str(e)}")
+    if not projects:
+        return results
+
+    try:
+        async with sem:
+            # Generate plain text content
+            contents = await generate_many_async(projects)
+
+        for i, (name, symbol, _, _), content in zip(indexes, projects, contents):
+            results[i] = save_content(name, symbol, content, out)
+
+    except Exception as e:
+        logger.error(f"Error processing {', '.join(str(name) for name, _, _, _ in projects)}: {str(e)}")
+    return results
+
+async def generate_all(df):
+    """Run every group of MERGE_SIZE rows concurrently, with at most CONCURRENCY requests in flight."""
+    sem = asyncio.Semaphore(CONCURRENCY)
+    groups = merge_groups(df.itertuples(index=False))
+    # One handle for the whole run; lines are written whole from the event loop thread
+    with open(OUTPUT_FILE, "ab") as out:
+        results = await asyncio.gather(*(generate_group(group, sem, out) for group in groups))
+    return [ok for group in results for ok in group]
+
 def main():
     try:
         # Read CSV
-        df = pd.read_csv("project_data.csv")
+        df = pd.read_csv(PROJECT_DATA_FILE, usecols=list(PROJECT_DATA_DTYPES), dtype=PROJECT_DATA_DTYPES)
         logger.info(f"Loaded CSV with {len(df)} rows")
+
+        # Make column names valid attribute names for itertuples (e.g. "Market Sector" -> "Market_Sector")
+        df.columns = [c.replace(" ", "_") for c in df.columns]
+
+        # Resume: skip symbols an earlier run already generated
+        done = read_done_symbols()
+        if done:
+            df = df[~df["Symbol"].str.lower().isin(done)]
+            logger.info(f"Skipping {len(done)} projects already in {OUTPUT_FILE}, {len(df)} remaining")
         
         # For testing, just use a couple of rows
         test_df = df.head(2)  # Just process the first 2 rows for testing
         logger.info(f"Processing {len(test_df)} projects for testing")
         
-        success_count = 0
-        error_count = 0
-        
-        for i, row in test_df.iterrows():
-            try:
-                name = row["Project"]
-                symbol = row["Symbol"].lower()
-                sector = row.get("Market Sector", "Unknown")
-                description = f"{name} is a decentralized protocol in the {sector} sector."
-                
-                # Generate plain text content
-                content = generate_gemini_content(name, symbol, sector, description)
-                
-                if content:
-                    # Save the raw text content for manual verification
-                    output_file = os.path.join(OUTPUT_DIR, f"{symbol}_raw_content.txt")
-                    with open(output_file, "w", encoding="utf-8") as f:
-                        f.write(content)
-                    
-                    logger.info(f"Saved raw content for {name} to {output_file}")
-                    success_count += 1
-                else:
-                    logger.warning(f"No content generated for {name}")
-                    error_count += 1
-                
-                # Delay to avoid rate limits
-                time.sleep(3)
-                
-            except Exception as e:
-                logger.error(f"Error processing {row.get('Project', 'Unknown')}: {str(e)}")
-                error_count += 1
-                continue
+        results = asyncio.run(generate_all(test_df))
+        success_count = results.count(True)
+        error_count = len(results) - success_count
         
         logger.info(f"Successfully generated content for {success_count} projects")
         logger.info(f"Failed to process {error_count} projects")
@@ -175,5 +164,4 @@ def main():
         logger.error(f"Exception traceback: {traceback.format_exc()}")
 
 if __name__ == "__main__":
-    import re  # Import here to avoid issues
     main()
\ No newline at end of file
@@ -1,5 +1,7 @@
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import uuid
 import os
@@ -23,6 +25,21 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 CMC_URL = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
 GEMINI_MODEL = "gemini-pro"
 PLACEHOLDER_COIN_ID = "00000000-0000-0000-0000-000000000000"
+CMC_BATCH_SIZE = 100  # Max symbols per quotes/latest request
+CMC_TIMEOUT = (3, 10)  # (connect, read) seconds; Retry alone never gives up on a stalled connection
+
+# Shared HTTP session so TCP/TLS connections are kept alive across CMC requests,
+# retrying rate limits and transient server errors with backoff
+SESSION = requests.Session()
+SESSION.headers.update({
+    'Accepts': 'application/json',
+    'X-CMC_PRO_API_KEY': CMC_API_KEY
+})
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=5, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
 
 # Symbol mapping for known CoinMarketCap discrepancies
 SYMBOL_MAPPING = {
@@ -148,11 +165,13 @@ def extract_json_from_response(response):
                     return json.loads(json_str)
                 except json.JSONDecodeError as e2:
                     logger.error(f"Failed to parse JSON after fix: {e2}")
-                    logger.debug(f"Problematic JSON string: {json_str[:500]}...")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"Problematic JSON string: {json_str[:500]}...")
                     return None
         else:
             logger.warning("No JSON object found in response.")
-            logger.debug(f"Response content: {response[:500]}...")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Response content: {response[:500]}...")
             return None
 
     except Exception as e:
@@ -169,14 +188,16 @@ def generate_gemini_content(name, symbol, sector, description):
     )
 
     try:
-        # Generate content with Gemini
+        # Generate content with Gemini; .text walks the candidates, so read it once
         response = model.generate_content(prompt)
+        text = response.text
 
         # Log the raw response for debugging
-        logger.debug(f"Raw response for {name}: {response.text[:200]}...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Raw response for {name}: {text[:200]}...")
 
         # Extract and parse JSON
-        content = extract_json_from_response(response.text)
+        content = extract_json_from_response(text)
         if content:
             # Update headings with correct symbol
             for key in ['valueGeneration', 'marketPosition', 'projectSize', 'RealWorldImpact', 'founders', 'problemSolving']:
@@ -195,47 +216,51 @@ def generate_gemini_content(name, symbol, sector, description):
         logger.error(f"Error generating Gemini content for {name}: {str(e)}")
         return DEFAULT_HF_CONTENT.copy()
 
-# Function to fetch data from CoinMarketCap
-def fetch_cmc_data(symbol):
-    # Apply symbol mapping if necessary
-    cmc_symbol = SYMBOL_MAPPING.get(symbol.lower(), symbol.upper())
+def format_quote(coin_data, cmc_symbol):
+    """Turn a CMC coin entry into the keyStats structure used in the project JSON."""
+    quote = coin_data['quote']['USD']
+    market_cap = "${:.2f} billion".format(quote['market_cap'] / 1e9) if quote['market_cap'] else "N/A"
+    volume_24h = "${:.2f} million (24h)".format(quote['volume_24h'] / 1e6) if quote['volume_24h'] else "N/A"
+    circulating_supply = "{:.2f} million {}".format(coin_data['circulating_supply'] / 1e6, cmc_symbol) if coin_data['circulating_supply'] else "N/A"
+    total_supply = "{:.2f} million {}".format(coin_data['total_supply'] / 1e6, cmc_symbol) if coin_data['total_supply'] else "N/A"
     
-    try:
-        parameters = {
-            'symbol': cmc_symbol,
-            'convert': 'USD'
-        }
-        headers = {
-            'Accepts': 'application/json',
-            'X-CMC_PRO_API_KEY': CMC_API_KEY
-        }
-        response = requests.get(CMC_URL, headers=headers, params=parameters)
-        response.raise_for_status()
-        data = response.json()
-        
-        if cmc_symbol in data['data']:
-            coin_data = data['data'][cmc_symbol]
-            quote = coin_data['quote']['USD']
-            market_cap = "${:.2f} billion".format(quote['market_cap'] / 1e9) if quote['market_cap'] else "N/A"
-            volume_24h = "${:.2f} million (24h)".format(quote['volume_24h'] / 1e6) if quote['volume_24h'] else "N/A"
-            circulating_supply = "{:.2f} million {}".format(coin_data['circulating_supply'] / 1e6, cmc_symbol) if coin_data['circulating_supply'] else "N/A"
-            total_supply = "{:.2f} million {}".format(coin_data['total_supply'] / 1e6, cmc_symbol) if coin_data['total_supply'] else "N/A"
-            
-            return {
-                "marketCap": market_cap,
-                "tradingVolume": volume_24h,
-                "circulatingSupply": circulating_supply,
-                "totalSupply": total_supply
+    return {
+        "marketCap": market_cap,
+        "tradingVolume": volume_24h,
+        "circulatingSupply": circulating_supply,
+        "totalSupply": total_supply
+    }
+
+# Function to fetch data from CoinMarketCap for many symbols at once
+def fetch_cmc_bulk(cmc_symbols):
+    """Fetch quotes for {symbol: CMC symbol} in ceil(N/100) requests. Returns {symbol: market data}."""
+    unique_cmc_symbols = list(dict.fromkeys(cmc_symbols.values()))
+    
+    quotes = {}
+    for start in range(0, len(unique_cmc_symbols), CMC_BATCH_SIZE):
+        chunk = unique_cmc_symbols[start:start + CMC_BATCH_SIZE]
+        try:
+            parameters = {
+                'symbol': ",".join(chunk),
+                'convert': 'USD',
+                'skip_invalid': 'true'  # One unknown symbol must not fail the whole batch with HTTP 400
             }
-        else:
-            logger.warning(f"Symbol not found in CMC response: {cmc_symbol}")
-            return None
-    except Exception as e:
-        logger.error(f"Error fetching CMC data for {symbol}: {str(e)}")
-        return None
+            response = SESSION.get(CMC_URL, params=parameters, timeout=CMC_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()['data']
+            
+            for cmc_symbol in chunk:
+                if cmc_symbol in data:
+                    quotes[cmc_symbol] = format_quote(data[cmc_symbol], cmc_symbol)
+                else:
+                    logger.warning(f"Symbol not found in CMC response: {cmc_symbol}")
+        except Exception as e:
+            logger.error(f"Error fetching CMC data for {','.join(chunk)}: {str(e)}")
+    
+    return {symbol: quotes[cmc_symbol] for symbol, cmc_symbol in cmc_symbols.items() if cmc_symbol in quotes}
 
 # Function to generate project JSON
-def generate_project_json(row):
+def generate_project_json(row, cmc_quotes):
     try:
         symbol = row["Symbol"].lower()
         name = row["Project"]
@@ -247,8 +272,8 @@ def generate_project_json(row):
         
         description = f"{name} is a decentralized protocol in the {sector} sector, offering innovative solutions for decentralized applications and services."
 
-        # Fetch market data
-        market_data = fetch_cmc_data(symbol) or {
+        # Look up the prefetched market data
+        market_data = cmc_quotes.get(symbol) or {
             "marketCap": "N/A",
             "tradingVolume": "N/A",
             "circulatingSupply": "N/A",
@@ -346,6 +371,13 @@ def main():
         df = pd.read_csv("how3.io score sheet - Score Sheet (Master).csv")
         logger.info(f"Loaded CSV with {len(df)} rows")
         
+        # Fetch market data for every symbol up front in batched requests
+        # Apply SYMBOL_MAPPING to the whole column at once so mapped names are queried
+        symbols = df["Symbol"].dropna().astype(str).str.lower().drop_duplicates()
+        cmc_symbols = symbols.map(SYMBOL_MAPPING).fillna(symbols.str.upper())
+        cmc_quotes = fetch_cmc_bulk(dict(zip(symbols, cmc_symbols)))
+        logger.info(f"Fetched CMC data for {len(cmc_quotes)}/{len(symbols)} symbols")
+        
         # Generate JSON
         result = {}
         success_count = 0
@@ -362,7 +394,7 @@ def main():
                 symbol = row["Symbol"].lower()
                 name = row["Project"]
                 
-                symbol, project = generate_project_json(row)
+                symbol, project = generate_project_json(row, cmc_quotes)
                 result[symbol] = project
                 
                 # Save partial output every 10 projects
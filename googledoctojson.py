@@ -1,4 +1,5 @@
 import json
+import orjson
 import re
 import os
 import logging
@@ -11,33 +12,75 @@ logger = logging.getLogger(__name__)
 # Output JSON file
 OUTPUT_FILE = "crypto_data.json"
 
+# Project name line (e.g., "AAVE", "Uniswap"); each is followed by that project's JSON
+PROJECT_NAME_RE = re.compile(r'\w+(?:\s+\w+)*')
+JSON_DECODER = json.JSONDecoder()
+
+# (benchmarkScores key, CSV column) pairs
+SCORE_KEYS = (("growth", "UGS"), ("earning", "EQS"), ("fairValue", "FVS"), ("safety", "SS"))
+
+def decode_project(project_name, parts):
+    """Decode a buffered JSON block, or return None and log why it is invalid."""
+    try:
+        return JSON_DECODER.raw_decode("".join(parts).strip())[0]
+    except json.JSONDecodeError as e:
+        logger.error(f"Invalid JSON for {project_name}: {str(e)}")
+        return None
+
 def parse_project_text(file_path):
-    """Read and parse project JSONs from a text file."""
+    """Yield (project name, project JSON) pairs from a text file, reading it line by line."""
+    count = 0
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # Split by project names followed by JSON
-        # Matches project name (e.g., "AAVE", "Uniswap") followed by JSON
-        pattern = r'(\w+(?:\s+\w+)*)\n\s*(\{[\s\S]*?\})(?=\n\s*\w+(?:\s+\w+)*\n\s*\{|\Z)'
-        matches = re.finditer(pattern, content, re.MULTILINE)
-        
-        projects = []
-        for match in matches:
-            project_name = match.group(1).strip()
-            json_str = match.group(2).strip()
-            try:
-                project_data = json.loads(json_str)
-                projects.append((project_name, project_data))
-            except json.JSONDecodeError as e:
-                logger.error(f"Invalid JSON for {project_name}: {str(e)}")
-                continue
-        
-        logger.info(f"Parsed {len(projects)} projects from {file_path}")
-        return projects
+            project_name = None
+            parts = None  # Lines of the JSON block being read, or None between blocks
+            open_indent = 0
+            pending = None  # Name-like line inside a block; a new project if a '{' line follows
+            for line in f:
+                stripped = line.strip()
+
+                if parts is not None and pending is not None:
+                    if stripped.startswith('{'):
+                        # The previous block never closed; start the next project
+                        decode_project(project_name, parts)
+                        project_name, parts = pending.strip(), None
+                    else:
+                        parts.append(pending)
+                    pending = None
+
+                if parts is None:
+                    if stripped.startswith('{'):
+                        parts = [line]
+                        open_indent = len(line) - len(line.lstrip())
+                    elif PROJECT_NAME_RE.fullmatch(stripped):
+                        project_name = stripped
+                        continue
+                    else:
+                        continue
+                elif PROJECT_NAME_RE.fullmatch(stripped):
+                    pending = line
+                    continue
+                else:
+                    parts.append(line)
+
+                # Only a closing brace at or left of the opening brace can end the block
+                if stripped.endswith('}') and len(line) - len(line.lstrip()) <= open_indent:
+                    try:
+                        project_data = JSON_DECODER.raw_decode("".join(parts).strip())[0]
+                    except json.JSONDecodeError:
+                        continue
+                    parts = None
+                    count += 1
+                    yield project_name, project_data
+
+            if parts is not None:
+                if pending is not None:
+                    parts.append(pending)
+                decode_project(project_name, parts)
+
+        logger.info(f"Parsed {count} projects from {file_path}")
     except Exception as e:
         logger.error(f"Error reading {file_path}: {str(e)}")
-        return []
 
 def validate_project_data(project_name, project_data):
     """Validate project JSON and extract token key."""
@@ -63,8 +106,8 @@ def load_existing_json(output_file):
     """Load existing JSON file if it exists."""
     if os.path.exists(output_file):
         try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(output_file, 'rb') as f:
+                return orjson.loads(f.read())
         except Exception as e:
             logger.error(f"Error loading {output_file}: {str(e)}")
             return {}
@@ -73,49 +116,55 @@ def load_existing_json(output_file):
 def save_json(data, output_file):
     """Save JSON data to file."""
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
         logger.info(f"Saved {len(data)} projects to {output_file}")
     except Exception as e:
         logger.error(f"Error saving {output_file}: {str(e)}")
 
 # Function to validate and update benchmark scores from CSV data
-def validate_benchmark_scores(project_data, scores_df):
+def index_scores(scores_df):
+    """Build {SYMBOL: row} and {project name: row} lookups; the first row wins on duplicates."""
+    scores_by_symbol = {}
+    scores_by_project = {}
+    for row in scores_df.to_dict("records"):
+        if isinstance(row["Symbol"], str):
+            symbol_upper = row["Symbol"].upper()
+            if symbol_upper in scores_by_symbol:
+                logger.warning(f"Multiple matches found for {symbol_upper}, using first match")
+            scores_by_symbol.setdefault(symbol_upper, row)
+        if isinstance(row["Project"], str):
+            scores_by_project.setdefault(row["Project"].lower(), row)
+    return scores_by_symbol, scores_by_project
+
+def validate_benchmark_scores(project_data, scores_by_symbol, scores_by_project):
     """
     Check if benchmark scores in project_data match those in the CSV.
     If not, update them with correct values from CSV.
     """
     try:
-        # Find the matching row in scores_df based on Symbol
+        # Find the matching row in the CSV based on Symbol
         symbol = next(iter(project_data))
-        
-        # Get both uppercase and lowercase versions to try matching
         symbol_upper = symbol.upper()
+        matching_row = scores_by_symbol.get(symbol_upper)
         
-        # Try to find match by uppercase symbol
-        matching_row = scores_df[scores_df['Symbol'].str.upper() == symbol_upper]
-        
-        if matching_row.empty:
+        if matching_row is None:
             # Try matching by project name
             project = project_data[symbol]
             if 'name' in project:
-                project_name = project['name'].replace('-', ' ').title()
-                matching_row = scores_df[scores_df['Project'].str.lower() == project_name.lower()]
+                project_name = project['name'].replace('-', ' ')
+                matching_row = scores_by_project.get(project_name.lower())
         
-        if matching_row.empty:
+        if matching_row is None:
             logger.warning(f"No matching row found in CSV for symbol: {symbol_upper}")
             return project_data, False
         
-        # If we have multiple matches, take the first one
-        if len(matching_row) > 1:
-            logger.warning(f"Multiple matches found for {symbol_upper}, using first match")
-            matching_row = matching_row.iloc[[0]]
-        
         # Extract score values from CSV (handle potential NaN values)
         csv_scores = {}
-        for key, csv_key in [("growth", "UGS"), ("earning", "EQS"), ("fairValue", "FVS"), ("safety", "SS")]:
-            if pd.notna(matching_row[csv_key].values[0]):
-                csv_scores[key] = float(matching_row[csv_key].values[0])
+        for key, csv_key in SCORE_KEYS:
+            value = matching_row[csv_key]
+            if pd.notna(value):
+                csv_scores[key] = float(value)
             else:
                 logger.warning(f"Missing {csv_key} value for {symbol_upper}")
                 csv_scores[key] = 0.0
@@ -192,44 +241,43 @@ def main(input_file, scores_csv_file):
     if scores_df is not None:
         logger.info(f"CSV columns: {list(scores_df.columns)}")
         logger.info(f"First few symbols in CSV: {list(scores_df['Symbol'].head())}")
-    
-    # Parse projects from input file
-    projects = parse_project_text(input_file)
-    if not projects:
-        logger.error("No valid projects found. Exiting.")
-        return
+        scores_by_symbol, scores_by_project = index_scores(scores_df)
     
     # Load existing JSON
     existing_data = load_existing_json(OUTPUT_FILE)
     
-    # Process each project
-    new_data = existing_data.copy()
+    # Process each project, updating existing_data in place
     success_count = 0
     error_count = 0
     score_updates = 0
     
-    for project_name, project_data in projects:
+    # Parse projects from input file as they are read
+    for project_name, project_data in parse_project_text(input_file):
         token, validated_data = validate_project_data(project_name, project_data)
         if token and validated_data:
             project_data = {token: validated_data}
             
             # Validate and update benchmark scores if CSV data is available
             if scores_df is not None:
-                project_data, scores_changed = validate_benchmark_scores(project_data, scores_df)
+                project_data, scores_changed = validate_benchmark_scores(project_data, scores_by_symbol, scores_by_project)
                 if scores_changed:
                     score_updates += 1
             
             # Add/update project data
-            if token in new_data:
+            if token in existing_data:
                 logger.warning(f"{project_name} ({token}) already exists. Overwriting.")
-            new_data[token] = project_data[token]
+            existing_data[token] = project_data[token]
             success_count += 1
             logger.info(f"Processed {project_name} ({token})")
         else:
             error_count += 1
     
+    if success_count + error_count == 0:
+        logger.error("No valid projects found. Exiting.")
+        return
+    
     # Save updated JSON
-    save_json(new_data, OUTPUT_FILE)
+    save_json(existing_data, OUTPUT_FILE)
     logger.info(f"Completed: {success_count} successful, {error_count} errors, {score_updates} score updates")
 
 if __name__ == "__main__":
@@ -0,0 +1,36 @@
+import logging
+import os
+import orjson
+
+logger = logging.getLogger(__name__)
+
+def progress_line(symbol, project, is_default):
+    """One JSONL progress line; rows built from default content are flagged so a resume retries them."""
+    return orjson.dumps({"symbol": symbol, "project": project, "default": is_default}) + b"\n"
+
+def read_progress(path):
+    """Load (projects, done) from the progress file of an earlier, possibly interrupted, run.
+
+    projects holds every saved row; done only the symbols generated from real content, so rows
+    that fell back to default content are generated again.
+    """
+    projects = {}
+    done = set()
+    if not os.path.exists(path):
+        return projects, done
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = orjson.loads(line)
+                symbol = entry["symbol"]
+                projects[symbol] = entry["project"]
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                logger.warning(f"Skipping truncated line in {path}")
+                continue
+            if entry.get("default"):
+                done.discard(symbol)
+            else:
+                done.add(symbol)
+    return projects, done
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by the API clients.
+
+    Allows bursts of up to `capacity` calls, then refills at `rate` calls per
+    `per` seconds. Callers only wait when the bucket is actually empty.
+    Safe to share between threads; use acquire_async() from coroutines.
+    """
+
+    def __init__(self, rate, per=60.0, capacity=None):
+        self.rate = rate / per
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _reserve(self):
+        """Take a token and return how long the caller must wait for it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a call is allowed."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+class GeminiRateLimiter:
+    """Sliding-window limiter for Gemini's requests-per-minute, tokens-per-minute
+    and requests-per-day quotas.
+
+    Each limit is scaled by `margin` so bursts stay clear of the server-side
+    quota. A call only waits when one of the windows is actually full, and then
+    only until its oldest entry ages out. Safe to share between threads.
+    """
+
+    def __init__(self, rpm, tpm, rpd, margin=0.8):
+        self.rpm = max(1, int(rpm * margin))
+        self.tpm = max(1, int(tpm * margin))
+        self.rpd = max(1, int(rpd * margin))
+        self.minute = deque()  # (timestamp, estimated tokens)
+        self.minute_tokens = 0
+        self.day = deque()  # timestamps
+        self.lock = threading.Lock()
+
+    def _try_reserve(self, tokens):
+        """Record a call if every window has room; otherwise return how long to wait."""
+        with self.lock:
+            now = time.monotonic()
+            while self.minute and now - self.minute[0][0] >= 60:
+                self.minute_tokens -= self.minute.popleft()[1]
+            while self.day and now - self.day[0] >= 86400:
+                self.day.popleft()
+
+            wait = 0.0
+            if len(self.minute) >= self.rpm:
+                wait = max(wait, self.minute[0][0] + 60 - now)
+            if self.minute and self.minute_tokens + tokens > self.tpm:
+                # Wait until enough of the oldest calls' tokens have aged out
+                excess = self.minute_tokens + tokens - self.tpm
+                for stamp, used in self.minute:
+                    excess -= used
+                    if excess <= 0:
+                        wait = max(wait, stamp + 60 - now)
+                        break
+            if len(self.day) >= self.rpd:
+                wait = max(wait, self.day[0] + 86400 - now)
+            if wait > 0:
+                return wait
+
+            self.minute.append((now, tokens))
+            self.minute_tokens += tokens
+            self.day.append(now)
+            return 0.0
+
+    def acquire(self, tokens=1):
+        """Block until a call of about `tokens` tokens is allowed."""
+        while (wait := self._try_reserve(tokens)) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """Wait, without blocking the event loop, until a call of about `tokens` tokens is allowed."""
+        while (wait := self._try_reserve(tokens)) > 0:
+            await asyncio.sleep(wait)
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def cache_key(**parts):
+    """Build a stable hex key from the model, prompt and any other inputs."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Content-addressed on-disk cache of raw LLM responses, one file per key."""
+
+    def __init__(self, directory, enabled=None, max_age=None):
+        self.directory = directory
+        self.max_age = max_age  # Seconds; older entries count as misses. None keeps entries forever
+        # Set LLM_CACHE=0 to bypass all response caches
+        if enabled is None:
+            enabled = os.getenv("LLM_CACHE", "1") == "1"
+        self.enabled = enabled
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.txt")
+
+    def get(self, key):
+        """Return the cached response for key, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            if self.max_age is not None and time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read cache entry {key}: {str(e)}")
+            return None
+
+    def set(self, key, response):
+        """Store a response atomically so concurrent or interrupted writers can't leave partial files."""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(response)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {key}: {str(e)}")
+
+    def clear(self):
+        """Delete every cached response and return how many were removed."""
+        removed = 0
+        if not os.path.isdir(self.directory):
+            return removed
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".txt"):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Could not remove cache entry {filename}: {str(e)}")
+        return removed
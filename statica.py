@@ -1,17 +1,35 @@
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import orjson
 import uuid
 import os
-import time
+import sys
 import re
 import logging
-from datetime import datetime
-from huggingface_hub import InferenceClient
+import logging.handlers
+import atexit
+import queue
+import asyncio
+import random
+from huggingface_hub import AsyncInferenceClient
 from dotenv import load_dotenv
+from rate_limiter import TokenBucket
+from response_cache import ResponseCache, cache_key
+from progress_log import progress_line, read_progress
+from content_schema import RESPONSE_SCHEMA, json_schema
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Set up logging. Records are only queued on the calling thread; a background listener
+# formats and writes them so the event loop never blocks on stderr
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, log_handler)
+logging.basicConfig(level=logging.INFO, format='%(message)s', handlers=[logging.handlers.QueueHandler(log_queue)])
+log_listener.start()
+atexit.register(log_listener.stop)  # Flush queued records on exit
 logger = logging.getLogger(__name__)
 
 # Load environment variables from .env file
@@ -21,27 +39,64 @@ load_dotenv()
 CMC_API_KEY = os.getenv("CMC_API_KEY")
 HF_API_KEY = os.getenv("HF_API_KEY")
 CMC_URL = "https://pro-api.coinmarketcap.com/v1/cryptocurrency/quotes/latest"
-HF_MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
+# Override to serve a quantized build (e.g. an AWQ checkpoint of the same model) from a self-hosted endpoint
+HF_MODEL = os.getenv("HF_MODEL", "mistralai/Mistral-7B-Instruct-v0.2")
+# Optional self-hosted text-generation-inference server (e.g. http://localhost:8080) serving the
+# same model; with prefix caching it encodes the shared instruction prefix once for all projects
+HF_ENDPOINT_URL = os.getenv("HF_ENDPOINT_URL")
+HF_TARGET = HF_ENDPOINT_URL or HF_MODEL
+# Projects in flight at once; a self-hosted server batches many sequences, the hosted API throttles
+HF_CONCURRENCY = 64 if HF_ENDPOINT_URL else 8
 PLACEHOLDER_COIN_ID = "00000000-0000-0000-0000-000000000000"
+CMC_BATCH_SIZE = 100  # Max symbols per quotes/latest request
+CMC_TIMEOUT = (3, 10)  # (connect, read) seconds; Retry alone never gives up on a stalled connection
+SCORE_COLUMNS = ["UGS", "EQS", "FVS", "SS"]
+REQUIRED_COLUMNS = {"Project", "Symbol", *SCORE_COLUMNS}  # "Market Sector" is optional
+HF_RATE_LIMIT = 30  # Inference requests per minute on the hosted API
+HF_MAX_RETRIES = 5  # Retries on 429/503 before giving up
+RETRY_BASE_DELAY = 1.0  # Seconds; doubles on each retry unless the server sends Retry-After
+RETRY_MAX_DELAY = 60.0
+RETRYABLE_STATUS = {429, 503}
+HF_CACHE_DIR = ".hf_cache"
+PROMPT_VERSION = "1"  # Bump when response parsing changes in ways the cache key can't see
+OUTPUT_FILE = "crypto_data.json"
+PROGRESS_FILE = "crypto_data_statica.jsonl"  # One {"symbol", "project", "default"} line per finished row; lets a crashed run resume
+HF_GENERATION_PARAMS = {
+    "max_new_tokens": 1400,  # The nine sections run ~1000-1300 tokens
+    "temperature": 0.1,      # More deterministic output
+    "repetition_penalty": 1.2,
+    "do_sample": True,
+    "return_full_text": False,
+    # text-generation-inference constrains decoding to the shared content schema, so the model
+    # can't wrap the object in prose or fences or leave trailing commas
+    "grammar": {"type": "json", "value": json_schema(RESPONSE_SCHEMA)}
+}
+# Used once if a response is cut off before the JSON object is closed
+HF_RETRY_GENERATION_PARAMS = {**HF_GENERATION_PARAMS, "max_new_tokens": 1800}
+
+# Label and color of each benchmark bar, in SCORE_COLUMNS order
+SCORE_BARS = [("Growth", "#4CAF50"), ("Earning", "#2196F3"), ("Fair Value", "#FFC107"), ("Safety", "#9C27B0")]
 
 # Symbol mapping for known CoinMarketCap discrepancies
 SYMBOL_MAPPING = {
     "aptos": "APT",
     # Add more mappings as needed
 }
+# Normalized once to match the lower-cased CSV symbols, however entries above are written
+SYMBOL_MAPPING = {symbol.lower(): cmc_symbol.upper() for symbol, cmc_symbol in SYMBOL_MAPPING.items()}
 
-# Initialize Hugging Face Inference Client
-hf_client = InferenceClient(token=HF_API_KEY)
+# Initialize Hugging Face Inference Client, pinned to the model (or local endpoint) so calls
+# skip per-request model resolution; one limiter paces every worker
+hf_client = AsyncInferenceClient(model=HF_TARGET, token=HF_API_KEY, headers={"X-use-cache": "true"})
+hf_limiter = None if HF_ENDPOINT_URL else TokenBucket(HF_RATE_LIMIT, per=60)
+response_cache = ResponseCache(HF_CACHE_DIR)
+_inflight = {}  # cache key -> future for requests currently being made by generate_hf_content
 
-# Prompt for Mistral-7B-Instruct-v0.2 (unchanged from your version)
-HF_PROMPT = """
-[INST] You are creating content for how3.io, a crypto analytics platform for retail investors transitioning from traditional finance. Generate jargon-free, beginner-friendly content for a cryptocurrency project. Use simple language, avoid technical terms, and make it engaging. Below are the project details and the sections to generate.
-
-**Project Details**:
-- Name: {name}
-- Symbol: {symbol}
-- Sector: {sector}
-- Description: {description}
+# Prompt for Mistral-7B-Instruct-v0.2. The project details come last so every prompt
+# shares the same long instruction prefix for the server's prefix/KV cache. The prefix
+# is a plain string, never formatted, so its literal JSON braces are safe.
+PROMPT_PREFIX = """
+[INST] You are creating content for how3.io, a crypto analytics platform for retail investors transitioning from traditional finance. Generate jargon-free, beginner-friendly content for a cryptocurrency project. Use simple language, avoid technical terms, and make it engaging. Below are the sections to generate, followed by the project details.
 
 **Sections to Generate**:
 1. **Value Generation (50-70 words)**:
@@ -71,17 +126,11 @@ HF_PROMPT = """
 
 7. **Strengths (3 strengths, each with a title and 2 sentences)**:
    - List 3 key strengths that make the project appealing to investors.
-   - Example:
-     - **Top Security**: Aave has never been hacked, which builds trust. Its careful design keeps user money safe.
-     - **Lots of Options**: Aave lets users lend or borrow many types of crypto. This variety makes it more useful than other platforms.
-     - **New Ideas**: Aave created features like flash loans that others now copy. Its innovation keeps it ahead in crypto.
+   - Example: **Top Security**: Aave has never been hacked, which builds trust. Its careful design keeps user money safe.
 
 8. **Weaknesses (3 weaknesses, each with a title and 2 sentences)**:
    - List 3 potential concerns for investors.
-   - Example:
-     - **Hard to Understand**: Aave’s platform can be tricky for beginners. Terms like ‘collateral’ confuse new users.
-     - **Market Risks**: If crypto prices crash, Aave’s loans could face problems. This makes it sensitive to market swings.
-     - **Regulation Worries**: Governments might make new rules for crypto lending. This could limit how Aave works in some places.
+   - Example: **Hard to Understand**: Aave’s platform can be tricky for beginners. Terms like ‘collateral’ confuse new users.
 
 9. **Whitepaper Summary (100-200 words)**:
    - Summarize the project’s core idea, innovation, token use, and problem solved.
@@ -106,10 +155,10 @@ Return a JSON object with the following structure:
     {"title": "...", "description": "..."},
     ...
   ],
-  "whitepaper": {"summary": "...", "lastUpdated": "2024-01-01", "readTime": 5, "dificultyTag": "Intermediate"}
+  "whitepaper": {"summary": "...", "title": "Whitepaper Summary", "lastUpdated": "2024-01-01", "readTime": 5, "dificultyTag": "Intermediate"}
 }
 ```
-[/INST]
+
 """
 
 # Default content for fallback
@@ -122,127 +171,255 @@ DEFAULT_HF_CONTENT = {
     "problemSolving": {"description": "N/A", "title": "Problem Solving", "heading": "What challenges does {symbol} solve?", "readTime": 3, "dificultyTag": "Beginner friendly"},
     "strengths": [],
     "weaknesses": [],
-    "whitepaper": {"summary": "N/A", "lastUpdated": "2024-01-01", "readTime": 5, "dificultyTag": "Intermediate"}
+    "whitepaper": {"summary": "N/A", "title": "Whitepaper Summary", "lastUpdated": "2024-01-01", "readTime": 5, "dificultyTag": "Intermediate"}
 }
 
+# Markdown fences around the JSON, and the trailing commas the model sometimes leaves in it
+JSON_FENCE_RE = re.compile(r'```json\n|```')
+TRAILING_COMMA_RE = re.compile(r',\s*([\]}])')
+JSON_DECODER = json.JSONDecoder()
+
+def decode_first_object(text, start):
+    """Decode the balanced JSON object starting at text[start], or return None."""
+    try:
+        return JSON_DECODER.raw_decode(text, start)[0]
+    except json.JSONDecodeError:
+        return None
+
+# Sections whose heading carries the {symbol} placeholder
+HEADING_SECTIONS = ['valueGeneration', 'marketPosition', 'projectSize', 'RealWorldImpact', 'founders', 'problemSolving']
+
+def default_hf_content(symbol):
+    """Fresh copy of DEFAULT_HF_CONTENT with the headings filled in, only built on the fallback path."""
+    default_content = {k: v.copy() for k, v in DEFAULT_HF_CONTENT.items()}
+    for key in HEADING_SECTIONS:
+        default_content[key]['heading'] = default_content[key]['heading'].format(symbol=symbol.upper())
+    return default_content
+
 # Function to clean and extract JSON from response
 def extract_json_from_response(response):
     try:
         # Remove any leading/trailing whitespace and common markdown markers
-        response = response.strip()
-        response = re.sub(r'```json\n|```', '', response)
-
-        # Find the first valid JSON object using regex
-        json_match = re.search(r'\{[\s\S]*?\}', response, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(0)
-            # Attempt to fix common JSON issues (e.g., trailing commas)
-            json_str = re.sub(r',\s*}', '}', json_str)
-            json_str = re.sub(r',\s*\]', ']', json_str)
-            return json.loads(json_str)
-        
-        logger.error("No valid JSON found in response")
-        return None
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON parsing error: {str(e)}")
-        logger.debug(f"Response content: {response[:500]}...")
-        return None
+        response = JSON_FENCE_RE.sub('', response.strip())
+
+        start = response.find('{')
+        if start == -1:
+            logger.error("No valid JSON found in response")
+            return None
+
+        # Fast path: everything from the first to the last brace is the object
+        try:
+            return orjson.loads(response[start:response.rfind('}') + 1])
+        except orjson.JSONDecodeError:
+            pass
+
+        # raw_decode matches nested braces and ignores whatever follows the object;
+        # failing that, drop trailing commas and try once more
+        content = decode_first_object(response, start)
+        if content is None:
+            content = decode_first_object(TRAILING_COMMA_RE.sub(r'\1', response[start:]), 0)
+        if content is None:
+            logger.error("JSON parsing error: no complete object in response")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Response content: {response[:500]}...")
+        return content
     except Exception as e:
         logger.error(f"Unexpected error in JSON extraction: {str(e)}")
         return None
 
+def build_prompt(name, symbol, sector, description):
+    """Append the per-project details to the static instruction prefix."""
+    return PROMPT_PREFIX + f"""**Project Details**:
+- Name: {name}
+- Symbol: {symbol.upper()}
+- Sector: {sector}
+- Description: {description}
+[/INST]
+"""
+
+def error_status(error):
+    """HTTP status and headers of an inference error; aiohttp and requests-style errors differ."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status", None) or getattr(response, "status_code", None)
+    headers = getattr(error, "headers", None) or getattr(response, "headers", None) or {}
+    return status, headers
+
+def retry_delay(headers, attempt):
+    """Honor Retry-After when the server sends one, else back off exponentially with jitter."""
+    try:
+        return min(RETRY_MAX_DELAY, float(headers.get("Retry-After")))
+    except (TypeError, ValueError):
+        return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt) + random.uniform(0, 1)
+
+def hit_token_limit(response):
+    """True if generation ran out of tokens before closing the JSON object."""
+    return not response.rstrip().endswith("}")
+
+async def request_hf(prompt, name, params=HF_GENERATION_PARAMS):
+    """Call the Inference API under the rate limiter, retrying 429/503 responses with backoff."""
+    for attempt in range(HF_MAX_RETRIES + 1):
+        if hf_limiter:
+            await hf_limiter.acquire_async()
+        try:
+            return await hf_client.text_generation(prompt=prompt, **params)
+        except Exception as e:
+            status, headers = error_status(e)
+            if status not in RETRYABLE_STATUS or attempt == HF_MAX_RETRIES:
+                raise
+            delay = retry_delay(headers, attempt)
+            logger.warning(f"HF returned {status} for {name}, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
 # Function to generate content with Hugging Face model
-def generate_hf_content(name, symbol, sector, description):
+async def generate_hf_content(name, symbol, sector, description):
     try:
-        # Format the prompt with project details
-        prompt = HF_PROMPT.format(
-            name=name,
-            symbol=symbol.upper(),
-            sector=sector,
-            description=description
-        )
+        prompt = build_prompt(name, symbol, sector, description)
         
-        # Generate text with conservative settings
-        response = hf_client.text_generation(
-            prompt=prompt,
-            model=HF_MODEL,
-            max_new_tokens=4000,  # Increased to avoid truncation
-            temperature=0.1,      # More deterministic output
-            repetition_penalty=1.2,
-            do_sample=True,
-            return_full_text=False
-        )
+        # Unchanged prompts and settings are answered from the on-disk cache
+        key = cache_key(model=HF_MODEL, endpoint=HF_ENDPOINT_URL, version=PROMPT_VERSION, params=HF_GENERATION_PARAMS, prompt=prompt)
+        response = response_cache.get(key)
+        waiter = _inflight.get(key)
+        cached = response is not None or waiter is not None
+        if response is not None:
+            logger.info(f"Using cached content for {name}")
+        elif waiter is not None:
+            # Identical prompts already being requested share that one call
+            logger.info(f"Waiting on in-flight request for {name}")
+            response = await waiter
+            if response is None:
+                raise RuntimeError("in-flight request failed")
+        else:
+            waiter = _inflight[key] = asyncio.get_running_loop().create_future()
+            try:
+                # Generate text with conservative settings
+                response = await request_hf(prompt, name)
+                if hit_token_limit(response) and extract_json_from_response(response) is None:
+                    logger.warning(f"Response for {name} was cut off, retrying with {HF_RETRY_GENERATION_PARAMS['max_new_tokens']} tokens")
+                    response = await request_hf(prompt, name, HF_RETRY_GENERATION_PARAMS)
+            finally:
+                # Waiters get None if this request failed
+                del _inflight[key]
+                waiter.set_result(response)
         
-        # Log the raw response for debugging
-        logger.debug(f"Raw response for {name}: {response[:200]}...")
+        # Log the raw response for debugging; skip building the message at INFO
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Raw response for {name}: {response[:200]}...")
         
         # Extract and parse JSON
         content = extract_json_from_response(response)
         if content:
+            # Only cache responses that parsed, so a bad answer is retried next run
+            if not cached:
+                response_cache.set(key, response)
+
             # Update headings with correct symbol
-            for key in ['valueGeneration', 'marketPosition', 'projectSize', 'RealWorldImpact', 'founders', 'problemSolving']:
-                if key in content and 'heading' in content[key]:
-                    content[key]['heading'] = content[key]['heading'].format(symbol=symbol.upper())
-            return content
+            for section in HEADING_SECTIONS:
+                if section in content and 'heading' in content[section]:
+                    content[section]['heading'] = content[section]['heading'].format(symbol=symbol.upper())
+            return content, False
         
         logger.warning(f"Failed to extract valid JSON for {name}, using default content")
-        default_content = {k: v.copy() for k, v in DEFAULT_HF_CONTENT.items()}
-        for key in ['valueGeneration', 'marketPosition', 'projectSize', 'RealWorldImpact', 'founders', 'problemSolving']:
-            default_content[key]['heading'] = default_content[key]['heading'].format(symbol=symbol.upper())
-        return default_content
+        return default_hf_content(symbol), True
 
     except Exception as e:
         logger.error(f"Error generating HF content for {name}: {str(e)}")
-        default_content = {k: v.copy() for k, v in DEFAULT_HF_CONTENT.items()}
-        for key in ['valueGeneration', 'marketPosition', 'projectSize', 'RealWorldImpact', 'founders', 'problemSolving']:
-            default_content[key]['heading'] = default_content[key]['heading'].format(symbol=symbol.upper())
-        return default_content
-
-# Function to fetch data from CoinMarketCap
-def fetch_cmc_data(symbol):
-    # Apply symbol mapping if necessary
-    cmc_symbol = SYMBOL_MAPPING.get(symbol.lower(), symbol.upper())
+        return default_hf_content(symbol), True
+
+# Shared HTTP session so TCP/TLS connections are kept alive across CMC requests,
+# retrying rate limits and transient server errors with backoff
+CMC_SESSION = requests.Session()
+CMC_SESSION.headers.update({
+    'Accepts': 'application/json',
+    'X-CMC_PRO_API_KEY': CMC_API_KEY
+})
+CMC_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+def scaled(values, scale):
+    """Format a column of amounts divided by scale to two decimals, as "{:.2f}" did per value."""
+    return (values / scale).map("{:.2f}".format)
+
+def format_quotes(coins):
+    """Turn CMC coin entries into the keyStats structures used in the project JSON, formatting
+    each stat for every coin in one column pass. Returns {CMC symbol: keyStats}."""
+    if not coins:
+        return {}
+    frame = pd.DataFrame.from_dict({
+        cmc_symbol: {
+            "market_cap": coin_data['quote']['USD']['market_cap'],
+            "volume_24h": coin_data['quote']['USD']['volume_24h'],
+            "circulating_supply": coin_data['circulating_supply'],
+            "total_supply": coin_data['total_supply']
+        }
+        for cmc_symbol, coin_data in coins.items()
+    }, orient="index").apply(pd.to_numeric, errors="coerce")
+    # Missing and zero amounts are shown as N/A
+    present = frame.notna() & frame.ne(0)
+    units = " million " + frame.index.to_series()
+    stats = pd.DataFrame({
+        "marketCap": ("$" + scaled(frame["market_cap"], 1e9) + " billion").where(present["market_cap"], "N/A"),
+        "tradingVolume": ("$" + scaled(frame["volume_24h"], 1e6) + " million (24h)").where(present["volume_24h"], "N/A"),
+        "circulatingSupply": (scaled(frame["circulating_supply"], 1e6) + units).where(present["circulating_supply"], "N/A"),
+        "totalSupply": (scaled(frame["total_supply"], 1e6) + units).where(present["total_supply"], "N/A")
+    })
+    return stats.to_dict("index")
+
+# Function to fetch data from CoinMarketCap for every project up front
+def prefetch_all_cmc(cmc_symbols):
+    """Fetch quotes for all (already mapped) CMC symbols in ceil(N/100) requests. Returns {CMC symbol: market data}."""
+    
+    coins = {}
+    for start in range(0, len(cmc_symbols), CMC_BATCH_SIZE):
+        chunk = cmc_symbols[start:start + CMC_BATCH_SIZE]
+        try:
+            parameters = {
+                'symbol': ",".join(chunk),
+                'convert': 'USD',
+                'skip_invalid': 'true'  # One unknown symbol must not fail the whole batch with HTTP 400
+            }
+            response = CMC_SESSION.get(CMC_URL, params=parameters, timeout=CMC_TIMEOUT)
+            response.raise_for_status()
+            data = orjson.loads(response.content)['data']
+            
+            for cmc_symbol in chunk:
+                if cmc_symbol in data:
+                    coins[cmc_symbol] = data[cmc_symbol]
+                else:
+                    logger.warning(f"Symbol not found in CMC response: {cmc_symbol}")
+        except Exception as e:
+            logger.error(f"Error fetching CMC data for {','.join(chunk)}: {str(e)}")
     
+    return format_quotes(coins)
+
+# Function to fetch data from CoinMarketCap for one symbol; only used when the prefetch missed it
+def fetch_cmc_data(cmc_symbol):
     try:
         parameters = {
             'symbol': cmc_symbol,
             'convert': 'USD'
         }
-        headers = {
-            'Accepts': 'application/json',
-            'X-CMC_PRO_API_KEY': CMC_API_KEY
-        }
-        response = requests.get(CMC_URL, headers=headers, params=parameters)
+        response = CMC_SESSION.get(CMC_URL, params=parameters, timeout=CMC_TIMEOUT)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         
         if cmc_symbol in data['data']:
-            coin_data = data['data'][cmc_symbol]
-            quote = coin_data['quote']['USD']
-            market_cap = "${:.2f} billion".format(quote['market_cap'] / 1e9) if quote['market_cap'] else "N/A"
-            volume_24h = "${:.2f} million (24h)".format(quote['volume_24h'] / 1e6) if quote['volume_24h'] else "N/A"
-            circulating_supply = "{:.2f} million {}".format(coin_data['circulating_supply'] / 1e6, cmc_symbol) if coin_data['circulating_supply'] else "N/A"
-            total_supply = "{:.2f} million {}".format(coin_data['total_supply'] / 1e6, cmc_symbol) if coin_data['total_supply'] else "N/A"
-            
-            return {
-                "marketCap": market_cap,
-                "tradingVolume": volume_24h,
-                "circulatingSupply": circulating_supply,
-                "totalSupply": total_supply
-            }
+            return format_quotes({cmc_symbol: data['data'][cmc_symbol]})[cmc_symbol]
         else:
             logger.warning(f"Symbol not found in CMC response: {cmc_symbol}")
             return None
     except Exception as e:
-        logger.error(f"Error fetching CMC data for {symbol}: {str(e)}")
+        logger.error(f"Error fetching CMC data for {cmc_symbol}: {str(e)}")
         return None
 
 # Function to generate project JSON
-def generate_project_json(row):
+async def generate_project_json(row, cmc_quotes):
     try:
-        symbol = row["Symbol"].lower()
-        name = row["Project"]
-        sector = row.get("Market Sector", "Unknown")
+        symbol = row.Symbol
+        name = row.Project
+        sector = row.Market_Sector
         
         # Handle missing values
         project_id = str(uuid.uuid4())
@@ -250,30 +427,34 @@ def generate_project_json(row):
         
         description = f"{name} is a decentralized protocol in the {sector} sector, offering innovative solutions for decentralized applications and services."
 
-        # Fetch market data
-        market_data = fetch_cmc_data(symbol) or {
+        # Look up the prefetched market data; a symbol the prefetch missed is fetched
+        # alongside the Hugging Face generation rather than before it
+        market_data = cmc_quotes.get(row.CMC_Symbol)
+        if market_data is None:
+            market_data, (hf_content, is_default) = await asyncio.gather(
+                asyncio.to_thread(fetch_cmc_data, row.CMC_Symbol),
+                generate_hf_content(name, symbol, sector, description)
+            )
+        else:
+            # Generate content with Hugging Face
+            hf_content, is_default = await generate_hf_content(name, symbol, sector, description)
+        market_data = market_data or {
             "marketCap": "N/A",
             "tradingVolume": "N/A",
             "circulatingSupply": "N/A",
             "totalSupply": "N/A"
         }
 
-        # Generate content with Hugging Face
-        hf_content = generate_hf_content(name, symbol, sector, description)
-
-        # Use scores from the CSV with fallback to 0
-        ugs = float(row.get("UGS", 0)) if pd.notna(row.get("UGS")) else 0
-        eqs = float(row.get("EQS", 0)) if pd.notna(row.get("EQS")) else 0
-        fvs = float(row.get("FVS", 0)) if pd.notna(row.get("FVS")) else 0
-        ss = float(row.get("SS", 0)) if pd.notna(row.get("SS")) else 0
+        # Scores from the CSV, already coerced with a fallback to 0
+        ugs, eqs, fvs, ss = row.UGS, row.EQS, row.FVS, row.SS
         
         # Generate JSON structure
         project = {
             "id": project_id,
             "coinId": coin_id,
-            "name": name.lower().replace(" ", "-"),
+            "name": row.Slug,
             "title": f"{name} Analysis for how3.io",
-            "logo": f"https://cryptologos.cc/logos/{name.lower().replace(' ', '-')}-{symbol}-logo.svg",
+            "logo": f"https://cryptologos.cc/logos/{row.Slug}-{symbol}-logo.svg",
             "description": description,
             "assetOverview": {
                 "valueGeneration": hf_content["valueGeneration"],
@@ -298,10 +479,8 @@ def generate_project_json(row):
                 "fairValue": fvs,
                 "safety": ss,
                 "barData": [
-                    {"label": "Growth", "value": ugs, "color": "#4CAF50"},
-                    {"label": "Earning", "value": eqs, "color": "#2196F3"},
-                    {"label": "Fair Value", "value": fvs, "color": "#FFC107"},
-                    {"label": "Safety", "value": ss, "color": "#9C27B0"}
+                    {"label": label, "value": value, "color": color}
+                    for (label, color), value in zip(SCORE_BARS, (ugs, eqs, fvs, ss))
                 ]
             },
             "whitepaper": hf_content["whitepaper"],
@@ -309,57 +488,103 @@ def generate_project_json(row):
                 "description": f"These scores compare {name}'s growth, revenue generation, valuation, and financial health to the overall cryptocurrency market. Higher scores indicate better performance and show {name}'s percentile in these areas. Compare scores across different cryptocurrencies to identify more attractive investments!"
             }
         }
-        return symbol, project
+        return symbol, project, is_default
     except Exception as e:
         logger.error(f"Error generating project JSON for {name}: {str(e)}")
         raise
 
+def write_json(path, data):
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+def check_config():
+    """Fail before any network call if an API key the run needs is missing."""
+    missing = [name for name, value in [("CMC_API_KEY", CMC_API_KEY), ("HF_API_KEY", HF_API_KEY or HF_ENDPOINT_URL)] if not value]
+    if missing:
+        raise EnvironmentError(f"Missing environment variables: {', '.join(missing)}")
+
+def check_columns(df):
+    """Fail before any network call if the score sheet lacks a column the run needs."""
+    missing = REQUIRED_COLUMNS - set(df.columns)
+    if missing:
+        raise ValueError(f"Score sheet is missing columns: {', '.join(sorted(missing))}")
+
+def prepare_rows(df):
+    """Drop rows without a symbol or project name and normalize the used columns once."""
+    missing = df["Symbol"].isna() | df["Project"].isna()
+    for i in df.index[missing]:
+        logger.warning(f"Skipping row {i}: Missing symbol or project name")
+    df = df[~missing]
+    sector = df["Market Sector"] if "Market Sector" in df else pd.Series("Unknown", index=df.index)
+    symbols = df["Symbol"].astype(str).str.lower()
+    df = df.assign(
+        Symbol=symbols,
+        Market_Sector=sector.fillna("Unknown"),
+        # URL-style name and the symbol CMC knows the project by, computed once per row
+        Slug=df["Project"].str.lower().str.replace(" ", "-", regex=False),
+        CMC_Symbol=symbols.map(SYMBOL_MAPPING).fillna(symbols.str.upper()),
+        **{column: pd.to_numeric(df[column], errors="coerce").fillna(0.0) for column in SCORE_COLUMNS}
+    )
+    return df[["Project", "Symbol", "Market_Sector", "Slug", "CMC_Symbol", *SCORE_COLUMNS]], int(missing.sum())
+
+async def process_row(i, total, row, cmc_quotes, sem, result, progress):
+    """Generate one project into result and append it to the progress file. Returns True on success."""
+    try:
+        async with sem:
+            symbol, project, is_default = await generate_project_json(row, cmc_quotes)
+        result[symbol] = project
+
+        # One line per project instead of rewriting everything so far
+        progress.write(progress_line(symbol, project, is_default))
+        progress.flush()
+
+        logger.info(f"Processed {i+1}/{total} - {symbol}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Error processing row {i} ({getattr(row, 'Project', 'Unknown')}): {str(e)}")
+        return False
+
+async def process_rows(df, cmc_quotes, result):
+    """Process every row concurrently into result, with at most HF_CONCURRENCY projects in flight."""
+    sem = asyncio.Semaphore(HF_CONCURRENCY)
+    # Lines are written whole from the event loop thread, so one handle serves every row
+    with open(PROGRESS_FILE, "ab") as progress:
+        outcomes = await asyncio.gather(*(process_row(i, len(df), row, cmc_quotes, sem, result, progress) for i, row in enumerate(df.itertuples(index=False))))
+    return result, outcomes
+
 # Main function with improved error handling
-def main():
+def main(force=False):
     try:
+        check_config()
+        
         # Read CSV
         df = pd.read_csv("how3.io score sheet - Score Sheet (Master).csv")
         logger.info(f"Loaded CSV with {len(df)} rows")
+        check_columns(df)
+        df, skipped = prepare_rows(df)
         
-        # Generate JSON
-        result = {}
-        success_count = 0
-        error_count = 0
+        # Resume: only from this script's own progress file, which exists while a run is
+        # unfinished. Rows it saved with default content are retried
+        result, done_symbols = ({}, set()) if force else read_progress(PROGRESS_FILE)
+        done = df["Symbol"].isin(done_symbols)
+        if done.any():
+            logger.info(f"Skipping {int(done.sum())} projects already generated, {int((~done).sum())} remaining")
+            df = df[~done]
         
-        for i, row in df.iterrows():
-            try:
-                # Skip rows without a symbol or project name
-                if pd.isna(row.get("Symbol")) or pd.isna(row.get("Project")):
-                    logger.warning(f"Skipping row {i}: Missing symbol or project name")
-                    error_count += 1
-                    continue
-                
-                symbol = row["Symbol"].lower()
-                name = row["Project"]
-                
-                symbol, project = generate_project_json(row)
-                result[symbol] = project
-                
-                # Save partial output every 10 projects
-                if (i + 1) % 10 == 0:
-                    with open(f"crypto_data_partial_{i+1}.json", "w") as f:
-                        json.dump(result, f, indent=2)
-                    logger.info(f"Saved partial output at {i+1} projects")
-                
-                # Add delay to avoid rate limits
-                time.sleep(3)  # Increased to 3 seconds to be conservative
-                
-                logger.info(f"Processed {i+1}/{len(df)} - {symbol}")
-                success_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error processing row {i} ({row.get('Project', 'Unknown')}): {str(e)}")
-                error_count += 1
-                continue
+        # Fetch market data for every symbol up front in batched requests
+        symbols = list(df["CMC_Symbol"].unique())
+        cmc_quotes = prefetch_all_cmc(symbols)
+        logger.info(f"Fetched CMC data for {len(cmc_quotes)}/{len(symbols)} symbols")
+        
+        # Generate JSON
+        result, outcomes = asyncio.run(process_rows(df, cmc_quotes, result))
+        success_count = outcomes.count(True) + int(done.sum())
+        error_count = len(outcomes) - outcomes.count(True) + skipped
         
-        # Save final output
-        with open("crypto_data.json", "w") as f:
-            json.dump(result, f, indent=2)
+        # Save final output, then start the next run fresh
+        write_json(OUTPUT_FILE, result)
+        os.remove(PROGRESS_FILE)
         
         logger.info(f"Successfully generated data for {success_count} cryptocurrencies")
         logger.info(f"Failed to process {error_count} cryptocurrencies")
@@ -369,4 +594,5 @@ def main():
         raise
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # --force regenerates projects that an interrupted run already saved
+    main(force="--force" in sys.argv)
\ No newline at end of file